@@ -9,111 +9,244 @@ import tables.at_risk_subset as ar
 import plots.phenotype_gene_plots as pgp
 import plots.phenotype_variant_plots as pvp
 import plots.all_variants_plots as avp
+import plots.export as export
+from pipeline import Stage, Pipeline
+from data_cleaning import conversion
+import data_cleaning.genotype_phenotype as gp
+from data_cleaning import false_positives
+from data_cleaning import depth_store as ds
+from data_cleaning import instrument
+import data_cleaning.cohorts as ch
 import pandas as pd
+import functools
+import argparse
+import glob
+import sys
 import os
 
 pd.set_option('display.max_columns', 500)
 
-def main(yale_phenotype, yale_all_variants, yale_most_damaging,
-         uk_phenotype, uk_all_variants, uk_most_damaging, yale_survival,
-         FILE_PATH):
+# source code read by the stages, editing a file re-runs the stages which use it
+SOURCE_PATH = os.path.dirname(os.path.abspath(__file__))
+DATA_SOURCES = (sorted(glob.glob(os.path.join(SOURCE_PATH, 'data_cleaning', '*.py'))) +
+                [os.path.join(SOURCE_PATH, x) for x in ['all_variant_dataframe.py',
+                                                       'most_damaging_dataframe.py']])
+# modules shared by the tables and plots
+RENDER_SOURCES = [os.path.join(SOURCE_PATH, x) for x in [
+    'data_cleaning/simple_filters.py', 'data_cleaning/false_positives.py',
+    'data_cleaning/conversion.py', 'plots/export.py', 'plots/plot_manipulations.py']]
+
+def main(cohorts, FILE_PATH, targets=None, force=False, workers=None, 
+         trace_memory=False, profile=False):
     ''' Create, merge and clean variant CSV files and utilise the resulting
         DataFrames to produce cleaned data, tables and plots within the output
-        directory.
+        directory. Only the stages which are out of date for the given targets
+        are run.
+
+    Args:
+        cohorts: list of cohorts.Cohort detailing each cohorts input files
+        targets: stage names or prefixes (e.g. tables.risk_ratio or plots),
+                 all stages are targeted if None
+        force: re-run the targeted stages even if they are up to date
+        workers: number of processes used to clean the cohorts and
+                 render the tables and plots
+        trace_memory: record the peak memory allocated by each stage
+        profile: write a cProfile dump of each stage to output/profiles
     '''
     # create output dirs
-    if not os.path.exists(FILE_PATH+'/output/'):
-        for sub_dir in ['cleaned_data', 'plots', 'tables']:
+    for sub_dir in ['cleaned_data', 'plots', 'tables']:
+        if not os.path.exists(FILE_PATH+'/output/'+sub_dir):
             os.makedirs(FILE_PATH+'/output/'+sub_dir)
-    # create and clean all variants DataFrame
-    all_tuple = av.create_all_variants(yale_phenotype, yale_all_variants, 
-                                       uk_phenotype, uk_all_variants)
-    UK_all_variants, Yale_all_variants, all_variants = all_tuple
-    all_variants.reset_index(inplace=True)
-    # create and clean most damaging DataFrame
-    most_damaging = md.create_most_damaging(UK_all_variants, uk_most_damaging, uk_phenotype,
-                                            Yale_all_variants, yale_most_damaging, yale_phenotype,
-                                            yale_survival, FILE_PATH)
-    # need to filter on depth so that we only calculate risks etc. on samples 
-    # we have sequenced successfully
-    most_damaging = most_damaging[most_damaging['Depth'] != 'LOW']
-    # output both DataFrames as CSV file
-    all_variants.to_csv(FILE_PATH+"/output/cleaned_data/All_Variants.csv")
-    most_damaging.to_csv(FILE_PATH+"/output/cleaned_data/Most_Damaging.csv")
-    # used most damaging DataFrame to produce plots and tables
-    tables(most_damaging, all_variants)
-    plots(most_damaging)
-    ar.at_risk_indvidiuals(most_damaging, FILE_PATH+"/output/tables/At_Risk.csv")
-
-def tables(most_damaging, all_variants):
-    ''' Create all the tables for the manuscript '''
-    demo.demographics_table(df=most_damaging, 
-                            outfile=FILE_PATH+"output/tables/Patient_Demographics.csv")
-    vt.variant_table(df=all_variants, 
-                     outfile=FILE_PATH+"output/tables/"
-                     "Pathogenic & Likely Pathogenic Variants Detected by NGS Panel.csv")
-    vt.variant_table(df=all_variants, 
-                     pathogenic=False, 
-                     outfile=FILE_PATH+"output/tables/VUS Variants Detected by NGS Panel.csv")
-    vs.variant_summary_table(df=all_variants, 
-                             outfile=FILE_PATH+"output/tables/Summary_of_Variants.csv")
-    rr.risk_ratio_table(df=most_damaging, 
-                        outfile=FILE_PATH+"output/tables/RR_table.csv") 
-
-def plots(most_damaging):
-    ''' Generate all plots associated with the manuscript'''
+    instrument.configure(trace_memory, FILE_PATH+'output/profiles/' if profile else None)
+    pipeline = build_pipeline(cohorts, FILE_PATH, workers)
+    try:
+        return pipeline.run(targets, force, workers)
+    finally:
+        report = instrument.write_report(FILE_PATH+'output/run_report.json', 
+                                         targets=targets or 'all', workers=workers)
+        print("\nINFO: the time and memory of each stage are within {}".format(report))
+
+def build_pipeline(cohorts, FILE_PATH, workers=None):
+    ''' Construct the graph of stages which produce the cleaned data,
+        tables and plots.
+    '''
+    stages = data_stages(cohorts, FILE_PATH, workers)
+    stages += tables(FILE_PATH)
+    stages += plots(FILE_PATH)
+    return Pipeline(stages, checkpoint_dir=FILE_PATH+'output/checkpoints/')
+
+def data_stages(cohorts, FILE_PATH, workers=None):
+    ''' Stages which create and clean the all variants and most damaging
+        DataFrames.
+    '''
+    ipath = FILE_PATH+'input_files/'
+    manifest = [ipath+ch.MANIFEST]
+    depth_dirs = [os.path.join(depth, assay) for depth in ch.input_files(cohorts, ['depth'])
+                  for assay in ds.ASSAY_DIRS]
+    av_inputs = (ch.input_files(cohorts, ['phenotype', 'all_variants']) + manifest +
+                 [gp.RECLASSIFIED_VARIANTS, false_positives.FALSE_POSITIVE_REGIONS] +
+                 DATA_SOURCES)
+    md_inputs = (ch.input_files(cohorts, ['phenotype', 'most_damaging', 'survival']) + 
+                 manifest + [gp.RECLASSIFIED_VARIANTS, 
+                             false_positives.FALSE_POSITIVE_REGIONS] + depth_dirs +
+                 DATA_SOURCES)
+    cleaned_path = FILE_PATH+"output/cleaned_data/"
+
+    def most_damaging(cohort_all_variants):
+        md_df = md.create_most_damaging(cohorts, cohort_all_variants, FILE_PATH, 
+                                        workers=workers)
+        # need to filter on depth so that we only calculate risks etc. on samples 
+        # we have sequenced successfully
+        md_df = md_df[md_df['Depth'] != 'LOW'].copy()
+        return conversion.compact_frame(md_df, cleaned_path+'Most_Damaging_Memory.csv')
+
+    def all_variants(cohort_all_variants):
+        all_df = cohort_all_variants.reset_index()
+        return conversion.compact_frame(all_df, cleaned_path+'All_Variants_Memory.csv')
+
+    return [
+        Stage('all_variants.cohorts', 
+              lambda: av.create_all_variants(cohorts, workers=workers),
+              inputs=av_inputs, checkpoint=True),
+        Stage('all_variants', all_variants,
+              deps=['all_variants.cohorts'], checkpoint=True),
+        Stage('most_damaging', most_damaging, 
+              deps=['all_variants.cohorts'], inputs=md_inputs, checkpoint=True),
+        Stage('most_damaging.no_mfs', 
+              lambda df: df[df['Known Syndrome'] != 'Marfan'],
+              deps=['most_damaging'], checkpoint=True),
+        # output both DataFrames as CSV file
+        output_stage('cleaned_data.all_variants', pd.DataFrame.to_csv, 'all_variants',
+                     cleaned_path+"All_Variants.csv", outfile_arg='path_or_buf'),
+        output_stage('cleaned_data.most_damaging', pd.DataFrame.to_csv, 'most_damaging',
+                     cleaned_path+"Most_Damaging.csv", outfile_arg='path_or_buf'),
+    ]
+
+def output_stage(name, func, dep, outfile, written=None, outfile_arg='outfile', **kwargs):
+    ''' Stage which calls func with the result of dep and the outfile.
+
+    Args:
+        written: files written by func if they differ from outfile
+        outfile_arg: name of funcs outfile argument
+        kwargs: further arguments parsed to func
+    '''
+    kwargs[outfile_arg] = outfile
+    return Stage(name, functools.partial(func, **kwargs), deps=[dep],
+                 inputs=source_files(func), outputs=written or [outfile], render=True)
+
+def source_files(func):
+    ''' The source of the module defining func (if it is part of the
+        analysis) and of the modules shared by the tables and plots.
+    '''
+    module = getattr(sys.modules.get(func.__module__), '__file__', None)
+    if module and os.path.abspath(module).startswith(SOURCE_PATH + os.sep):
+        return [os.path.abspath(module)] + RENDER_SOURCES
+    return []
+
+def plot_stage(name, func, dep, outfile, formats=None, **kwargs):
+    ''' Stage which calls a plotting func that writes the outfile in
+        every export format.
+
+    Args:
+        formats: the formats func writes, if not export.FORMATS
+    '''
+    return output_stage(name, func, dep, outfile, 
+                        written=export.figure_files(outfile, formats), **kwargs)
+
+def tables(FILE_PATH):
+    ''' Stages which create all the tables for the manuscript '''
+    table_path = FILE_PATH+"output/tables/"
+    return [
+        output_stage('tables.demographics', demo.demographics_table, 'most_damaging',
+                     table_path+"Patient_Demographics.csv"),
+        output_stage('tables.plp_variants', vt.variant_table, 'all_variants',
+                     table_path+"Pathogenic & Likely Pathogenic Variants "
+                     "Detected by NGS Panel.csv"),
+        output_stage('tables.vus_variants', vt.variant_table, 'all_variants',
+                     table_path+"VUS Variants Detected by NGS Panel.csv",
+                     pathogenic=False),
+        output_stage('tables.variant_summary', vs.variant_summary_table, 'all_variants',
+                     table_path+"Summary_of_Variants.csv"),
+        output_stage('tables.risk_ratio', rr.risk_ratio_table, 'most_damaging',
+                     table_path+"RR_table.csv"),
+        output_stage('tables.risk_ratio_bootstrap', rr.risk_ratio_table, 'most_damaging',
+                     table_path+"RR_table_Bootstrap_CI.csv", ci='bootstrap', seed=0),
+        output_stage('tables.at_risk', ar.at_risk_indvidiuals, 'most_damaging',
+                     table_path+"At_Risk.csv"),
+        output_stage('tables.at_risk_distribution', ar.risk_score_distribution,
+                     'most_damaging', table_path+"At_Risk_Distribution.csv"),
+    ]
+
+def plots(FILE_PATH):
+    ''' Stages which generate all plots associated with the manuscript'''
     plot_path = FILE_PATH+'output/plots/'
-    no_mfs = most_damaging[most_damaging['Known Syndrome'] != 'Marfan']
-
-    avp.all_variants_barplot(df=most_damaging,
-                             outfile=plot_path+'All Most Damaging Variant Counts.png')
-    pvp.age_v_family_history(df=most_damaging, 
-                             column='age at diagnosis', 
-                             outfile=plot_path+'Age at Diagnosis Vs Family History.png')
-    pvp.variant_class_violin(df=most_damaging, 
-                             column='age at diagnosis',
-                             #title='Age at Diagnosis Vs Variant Class',
-                             outfile=plot_path+\
-                             'Age at Diagnosis Vs Variant Class.png')
-    pvp.variant_class_violin(df=no_mfs,
-                             column='age at diagnosis',
-                             #title='Age at Diagnosis Vs Variant Class - No MFS',
-                             outfile=plot_path+\
-                             'Age at Diagnosis Vs Variant Class - No MFS.png')
-    pvp.age_group_v_pathogenic_piechart(df=most_damaging,
-                                        outfile=plot_path+\
-                                        'Age Group Vs Variant Class.png')
-    pvp.age_group_v_pathogenic_piechart(df=no_mfs,
-                                        outfile=plot_path+\
-                                        'Age Group Vs Variant Class'
-                                        '- No MFS.png')
-    pvp.fh_vs_genetic_diagnosis(df=most_damaging,
-                                outfile=plot_path+\
-                                'Family History Vs Variant Class.png')
-    pvp.gender_vs_genetic_diagnosis(df=most_damaging,
-                                    outfile=plot_path+\
-                                    'Gender Vs Variant Class.png')
-    pgp.fh_v_genes_facetgrid(df=most_damaging,
-                             outfile=plot_path+\
-                             'Family Vs PLP Genes.png')
-    pgp.age_diagnosis_v_genes(df=most_damaging,
-                              outfile=plot_path+\
-                              'Age at Diagnosis Vs PLP Genes.png')
+    return [
+        plot_stage('plots.all_variants_barplot', avp.all_variants_barplot, 'most_damaging',
+                   plot_path+'All Most Damaging Variant Counts.png', 
+                   formats=avp.BARPLOT_FORMATS),
+        plot_stage('plots.age_v_family_history', pvp.age_v_family_history, 'most_damaging',
+                   plot_path+'Age at Diagnosis Vs Family History.png',
+                   column='age at diagnosis'),
+        plot_stage('plots.variant_class_violin', pvp.variant_class_violin, 'most_damaging',
+                   plot_path+'Age at Diagnosis Vs Variant Class.png',
+                   #title='Age at Diagnosis Vs Variant Class',
+                   column='age at diagnosis'),
+        plot_stage('plots.variant_class_violin_no_mfs', pvp.variant_class_violin, 
+                   'most_damaging.no_mfs',
+                   plot_path+'Age at Diagnosis Vs Variant Class - No MFS.png',
+                   #title='Age at Diagnosis Vs Variant Class - No MFS',
+                   column='age at diagnosis'),
+        plot_stage('plots.age_group_v_pathogenic_piechart', 
+                   pvp.age_group_v_pathogenic_piechart, 'most_damaging',
+                   plot_path+'Age Group Vs Variant Class.png'),
+        plot_stage('plots.age_group_v_pathogenic_piechart_no_mfs', 
+                   pvp.age_group_v_pathogenic_piechart, 'most_damaging.no_mfs',
+                   plot_path+'Age Group Vs Variant Class- No MFS.png'),
+        plot_stage('plots.fh_vs_genetic_diagnosis', pvp.fh_vs_genetic_diagnosis, 
+                   'most_damaging', plot_path+'Family History Vs Variant Class.png'),
+        plot_stage('plots.gender_vs_genetic_diagnosis', pvp.gender_vs_genetic_diagnosis, 
+                   'most_damaging', plot_path+'Gender Vs Variant Class.png'),
+        plot_stage('plots.fh_v_genes_facetgrid', pgp.fh_v_genes_facetgrid, 'most_damaging',
+                   plot_path+'Family Vs PLP Genes.png'),
+        plot_stage('plots.age_diagnosis_v_genes', pgp.age_diagnosis_v_genes, 'most_damaging',
+                   plot_path+'Age at Diagnosis Vs PLP Genes.png'),
+    ]
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Produce the cleaned data, tables and plots for the TAAD analysis. '
+                    'Only stages which are out of date for the given targets are run.')
+    parser.add_argument('targets', nargs='*', 
+                        help='stage names or prefixes to produce e.g. tables.risk_ratio, '
+                             'plots.variant_class_violin or plots (default: all stages)')
+    parser.add_argument('--force', action='store_true',
+                        help='re-run the targets even if they are up to date')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of processes used to clean the cohorts and render '
+                             'the tables and plots (default: one per cohort/CPU)')
+    parser.add_argument('--list', action='store_true',
+                        help='list the stages required by the targets and whether '
+                             'they are out of date, then exit')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='record the peak memory allocated by each stage in '
+                             'output/run_report.json, which slows down each stage')
+    parser.add_argument('--profile', action='store_true',
+                        help='write a cProfile dump of each stage to output/profiles')
+    return parser.parse_args(args)
 
 
 if __name__ == '__main__':
     FILE_PATH = os.path.dirname(os.path.abspath("__file__"))+"/TAAD_analysis/"
     ipath = FILE_PATH+'input_files/'
 
-    yale_phenotype = ipath+'Yale_Phenotype_Data.csv'
-    yale_all_variants = ipath+'Yale_All_Variants_Data.csv'
-    yale_most_damaging = ipath+'Yale_Most_Damaging_Data.csv'
-    yale_survival = FILE_PATH+"/input_files/Yale_Survival_Data_Clean.csv"
-   
-    uk_phenotype = ipath+'UK_Phenotype_Data.csv'
-    uk_all_variants = ipath+'UK_All_Variants_Data.csv'
-    uk_most_damaging = ipath+'UK_Most_Damaging_Data.csv'
-
-    main(yale_phenotype, yale_all_variants, yale_most_damaging, 
-         uk_phenotype, uk_all_variants, uk_most_damaging, yale_survival,
-         FILE_PATH)
+    # input files of each cohort, see input_files/cohorts.csv
+    cohorts = ch.read_manifest(ipath)
+
+    args = parse_args()
+    if args.list:
+        pipeline = build_pipeline(cohorts, FILE_PATH, args.workers)
+        for name, stale in pipeline.stale_stages(args.targets, args.force).items():
+            print('{:<50} {}'.format(name, 'out of date' if stale else 'up to date'))
+    else:
+        main(cohorts, FILE_PATH, targets=args.targets, force=args.force, 
+             workers=args.workers, trace_memory=args.trace_memory, profile=args.profile)
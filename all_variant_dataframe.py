@@ -1,54 +1,70 @@
 import data_cleaning.genotype_phenotype as gp
 import data_cleaning.simple_filters as sf
 import data_cleaning.new_columns as nc
+import data_cleaning.cohorts as ch
+from data_cleaning import instrument
 import pandas as pd
+import numpy as np
 from data_cleaning import conversion
 from data_cleaning import rename
 
-def create_all_variants(yale_phenotype, yale_genotype, uk_phenotype, uk_genotype):
-    ''' Clean and concatenate the Yale and UK all 
-        variants data.
+def create_all_variants(cohorts, workers=None):
+    ''' Clean and concatenate the all variants data of every cohort. 
+        Each cohort is cleaned in a separate process.
     
     Args:
-        yale_phenotype: path to yale phenotype data
-        yale_genotype: path to yale genotype data
-        uk_phenotype: path to uk phenotype data
-        uk_genotype: path to uk genotype data
+        cohorts: list of cohorts.Cohort detailing each cohorts input files
+        workers: number of processes, defaults to one per cohort (up to 
+                 the number of CPUs)
     
     Returns:
-        a tuple of cleaned and merged uk all variants, 
-        yale all variants and combined all variants data
-    '''    
-    UK_all_variants_clean = cohort_all_variants(uk_phenotype, uk_genotype, 'UK')
-    Yale_all_variants_clean = cohort_all_variants(yale_phenotype, yale_genotype, 'Yale')
-    all_variants = pd.concat([UK_all_variants_clean,
-                              Yale_all_variants_clean])
-    return (UK_all_variants_clean, Yale_all_variants_clean, all_variants)
+        combined all variants data of every cohort
+    '''
+    cleaned = ch.map_cohorts(cohort_all_variants, cohorts, workers=workers)
+    return combine_all_variants(cleaned)
 
-def cohort_all_variants(phenotype, genotype, cohort):
+def combine_all_variants(cohorts):
+    ''' Concatenate the cleaned all variants data of each cohort'''
+    category_columns = [col for col, dtype in gp.GENOTYPE_DTYPES.items() if dtype == 'category']
+    cohorts = conversion.union_categories(cohorts, rename.ENTRY_COLUMNS + category_columns)
+    return pd.concat(cohorts)
+
+def cohort_all_variants(cohort):
     ''' Merge and clean a cohorts phenotype and genotype data'''
-    variants = gp.merge_genotype_phenotype(phenotype, genotype)
-    variants['cohort'] = cohort
-    clean_variants = clean_all_var_df(variants)
+    name = 'all_variants.{}'.format(cohort.cohort)
+    variants = instrument.measure(name + '.merge', gp.merge_genotype_phenotype, 
+                                  cohort.phenotype, cohort.all_variants)
+    variants['cohort'] = cohort.cohort
+    clean_variants = instrument.measure(name + '.clean', clean_all_var_df, variants)
     return clean_variants
 
 def clean_all_var_df(df, three_categories=True):
     ''' Clean up of the all variants data. '''
     df = df[df['Symbol'] != 'SMAD4'] #SMAD4 should be ignored
-    df['Dup'] = df.apply(lambda x: mark_duplicate_samples(x, df), axis=1)
+    df['Dup'] = mark_duplicate_samples(df)
     df = df[~df['Dup'].str.contains("Duplicate")]
     df = conversion.convert2numeric(df, ['age at diagnosis'])
     # rename_columns performed in merge_genotype_phenotype
     df = rename.rename_columns(df)
     df = rename.rename_entries(df)
     df = nc.create_new_columns(df, three_categories)
-    df = df[~df['Sample'].str.contains("Blank|blank|ddH20|dH2O|H2O|BLANK|ddh2o")]
-    df = sf.no_SKI_exon1(df)
+    df = df[~(sf.mask(df, 'negative_control') | sf.mask(df, 'false_positive_region'))]
     return df
 
-def mark_duplicate_samples(x, df):
-    ''' Mark all duplicate samples so they can be later remove'''
-    if x['Sample'][:-2] in df['Sample'].tolist() or x['Sample'].endswith('_pool7A'):
-        return "Duplicate"
-    else:
-        return "-"
+def mark_duplicate_samples(df, column='Sample'):
+    ''' Mark all duplicate samples so they can be later removed. A sample
+        is a duplicate if its name minus the last two characters (_2, _3)
+        is also present in the df or it ends with _pool7A.
+
+    Args:
+        df: DataFrame
+        column: column containing the sample names
+
+    Returns:
+        Series containing "Duplicate" or "-" for each row in df
+    '''
+    samples = df[column].astype(str)
+    # hashed lookup built once rather than a list scan per row
+    known_samples = pd.Index(samples.unique())
+    dup = samples.str[:-2].isin(known_samples) | samples.str.endswith('_pool7A')
+    return pd.Series(np.where(dup, "Duplicate", "-"), index=df.index)
@@ -0,0 +1,32 @@
+''' Benchmark mark_duplicate_samples() across increasing numbers of rows
+    to demonstrate that duplicate marking scales linearly.
+
+    python3 benchmarks/bench_duplicate_samples.py
+'''
+import timeit
+import numpy as np
+import pandas as pd
+from all_variant_dataframe import mark_duplicate_samples
+
+def synthetic_samples(n, seed=0):
+    ''' Create a DataFrame of n sample names where roughly 5% are
+        duplicates suffixed with _2, _3 or _pool7A.
+    '''
+    rng = np.random.RandomState(seed)
+    n_unique = n - n // 20
+    names = np.array(['24XX{:07d}'.format(i) for i in range(n_unique)], dtype=object)
+    dups = rng.choice(n_unique, size=n // 20, replace=False)
+    suffixes = rng.choice(['_2', '_3', '_pool7A'], size=len(dups))
+    dup_names = [names[i] + s for i, s in zip(dups, suffixes)]
+    return pd.DataFrame({'Sample': np.concatenate([names, dup_names])})
+
+def main(sizes=(10**3, 10**4, 10**5, 10**6), repeat=3):
+    print('{:>10} {:>12} {:>14}'.format('rows', 'seconds', 'us per row'))
+    for n in sizes:
+        df = synthetic_samples(n)
+        best = min(timeit.repeat(lambda: mark_duplicate_samples(df),
+                                 number=1, repeat=repeat))
+        print('{:>10d} {:>12.4f} {:>14.3f}'.format(n, best, best / n * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+''' Benchmark the rule table driven create_new_columns() against the
+    previous row-wise implementation on a synthetic all variants frame.
+
+    python3 benchmarks/bench_new_columns.py
+'''
+import timeit
+import numpy as np
+import pandas as pd
+from data_cleaning import new_columns as nc
+from data_cleaning import false_positives
+
+def synthetic_all_variants(n, seed=0):
+    ''' Create a DataFrame of n rows containing the columns used
+        by create_new_columns().
+    '''
+    rng = np.random.RandomState(seed)
+    history = ['yes', 'no', 'unknown', 'Y', 'y', 'Marfan']
+    locations = ['ascending', 'Ascending+arch', 'descending', 'hemi arch',
+                 'Thoracoabdomen', 'Descending thoracic', np.nan]
+    categories = ['Pathogenic', 'Likely Pathogenic', 'Uncertain Significance',
+                  'Not Classified', 'No Variant', np.nan]
+    symbols = ['SKI', 'FBN1', 'TGFBR2', 'MYH11', 'ACTA2']
+    exons = ['1/7', '01-Jul', '2/7', '12/65', np.nan]
+    symbol = rng.choice(symbols, n)
+    exon = rng.choice(np.array(exons, dtype=object), n)
+    # SKI exon 1 variants lie within the registered false positive region, as
+    # do some unannotated variants, and some annotated variants lie outside it
+    ski_exon1 = (symbol == 'SKI') & np.isin(exon, ['1/7', '01-Jul'])
+    ski_exon1 ^= rng.uniform(size=n) < 0.01
+    return pd.DataFrame({
+        'Sample': ['24XX{:07d}'.format(i) for i in range(n)],
+        'probable family_history': rng.choice(history, n),
+        'proven family_history': rng.choice(history, n),
+        'age at diagnosis': rng.uniform(10, 90, n).round(),
+        'location of primary diagnosis': rng.choice(np.array(locations, dtype=object), n),
+        'Category': rng.choice(np.array(categories, dtype=object), n),
+        'Symbol': symbol,
+        'Exon': exon,
+        'Chrom': 1,
+        'Pos': np.where(ski_exon1, 2160500, 2300000),
+    })
+
+def legacy_create_new_columns(df, three_categories=True):
+    ''' The previous row-wise implementation of create_new_columns().'''
+    def family_history(x):
+        both = (x['probable family_history'].lower(), x['proven family_history'].lower())
+        if 'yes' in both or 'y' in both or 'marfan' in both:
+            return 'yes'
+        elif 'unknown' in both and both[0] != 'no' and both[1] != 'no':
+            return 'unknown'
+        elif both[0] == 'no' or both[1] == 'no':
+            return 'no'
+
+    def young_old(x):
+        x = x['age at diagnosis']
+        if x < 50:
+            return 'Under 50'
+        elif x >= 50:
+            return 'Over 50'
+        return "-"
+
+    def plus2slash(x):
+        location = x['location of primary diagnosis']
+        if isinstance(location, str):
+            for old, new in nc.LOCATION_REPLACEMENTS:
+                location = location.replace(old, new)
+        return location
+
+    def new_category(x):
+        ski = x['Symbol'] == 'SKI'
+        if three_categories:
+            if ski and x['Exon'] in ("1/7", "01-Jul"):
+                return "Likely Benign / No Variant"
+            elif x['Category'] in ("Pathogenic", "Likely Pathogenic"):
+                return "Pathogenic/Likely Pathogenic"
+            elif x['Category'] == 'Not Classified':
+                return "Likely Benign / No Variant"
+            elif x['Category'] == 'Uncertain Significance':
+                return 'VUS'
+            elif str(x['Category']) == 'nan' or x['Category'] == 'No Variant':
+                return "Likely Benign / No Variant"
+            return x['Category']
+        if ski and x['Exon'] == "01-Jul":
+            return "Likely Benign / No Variant"
+        elif x['Category'] in ('Uncertain Significance', 'Not Classified'):
+            return 'Likely Benign / No Variant'
+        elif x['Category'] in ("Pathogenic", "Likely Pathogenic"):
+            return "Pathogenic/Likely Pathogenic"
+        return x['Category']
+
+    df['family_history'] = df.apply(family_history, axis=1)
+    df['Age Group'] = df.apply(young_old, axis=1)
+    df['location of primary diagnosis'] = df.apply(plus2slash, axis=1).astype(str)
+    df['simple location of primary diagnosis'] = df.apply(
+        lambda x: "Ascending" if "Ascending" in str(x['location of primary diagnosis'])
+        else "Not Ascending", axis=1)
+    df['New Category'] = df.apply(new_category, axis=1)
+    return df
+
+def positional_annotation(df):
+    ''' Return a copy of df whose SKI exon 1 annotation agrees with the false
+        positive regions. With three categories create_new_columns() flags
+        SKI exon 1 by position rather than by Symbol and Exon, so the legacy
+        output of this copy is the expected output.
+    '''
+    df = df.copy()
+    in_region = false_positives.in_regions(df)
+    annotated = (df['Symbol'] == 'SKI') & df['Exon'].isin(['1/7', '01-Jul'])
+    df.loc[in_region & ~annotated, ['Symbol', 'Exon']] = ['SKI', '1/7']
+    df.loc[~in_region & annotated, 'Exon'] = '2/7'
+    return df
+
+def main(sizes=(10**3, 10**4, 10**5), repeat=3):
+    columns = ['family_history', 'Age Group', 'location of primary diagnosis',
+               'simple location of primary diagnosis', 'New Category']
+    print('{:>10} {:>8} {:>12} {:>12} {:>9}'.format('rows', 'three', 'legacy (s)', 
+                                                    'rules (s)', 'speedup'))
+    for n in sizes:
+        df = synthetic_all_variants(n)
+        for three_categories in (True, False):
+            expected = positional_annotation(df) if three_categories else df.copy()
+            legacy = legacy_create_new_columns(expected, three_categories)
+            rules = nc.create_new_columns(df.copy(), three_categories)
+            pd.testing.assert_frame_equal(legacy[columns].astype(object), 
+                                          rules[columns].astype(object))
+            t_legacy = min(timeit.repeat(
+                lambda: legacy_create_new_columns(df.copy(), three_categories),
+                number=1, repeat=repeat))
+            t_rules = min(timeit.repeat(
+                lambda: nc.create_new_columns(df.copy(), three_categories),
+                number=1, repeat=repeat))
+            print('{:>10d} {:>8} {:>12.4f} {:>12.4f} {:>8.1f}x'.format(
+                n, str(three_categories), t_legacy, t_rules, t_legacy / t_rules))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+''' Benchmark every stage of the pipeline against synthetic cohorts of
+    increasing size (see synthetic_cohort.py). The wall time, CPU time and
+    peak traced memory of each stage recorded by data_cleaning.instrument
+    are reported: the data stages, the per cohort merges, each step of
+    create_most_damaging() and each table and plot. Stages which fail are
+    reported and the rest still run.
+
+    python3 benchmarks/bench_stages.py --samples 1000 10000 100000
+'''
+import argparse
+import collections
+import gc
+import importlib.util
+import os
+import shutil
+import tempfile
+import pandas as pd
+from data_cleaning import input_cache
+from data_cleaning import instrument
+from benchmarks.synthetic_cohort import write_synthetic_inputs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Measurement = collections.namedtuple('Measurement', ['seconds', 'cpu_seconds', 'peak_mb',
+                                                     'error'])
+
+def load_stages():
+    ''' Return the module defining the pipelines stages. __main__.py can't be
+        imported by name, so it is loaded from its path.
+    '''
+    spec = importlib.util.spec_from_file_location('taad_main', os.path.join(ROOT, '__main__.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def benchmark_stages(file_path, cohorts, memory=True):
+    ''' Run every stage of the pipeline built for the cohorts in this
+        process and return the stages measured by instrument.measure().
+
+    Args:
+        file_path: TAAD_analysis directory containing the input_files
+        cohorts: list of cohorts.Cohort
+        memory: trace the peak memory allocated by each stage, which slows
+                down each stage
+
+    Returns:
+        OrderedDict of stage name and Measurement
+    '''
+    taad = load_stages()
+    for sub_dir in ['cleaned_data', 'plots', 'tables']:
+        os.makedirs(os.path.join(file_path, 'output', sub_dir), exist_ok=True)
+    pipeline = taad.build_pipeline(cohorts, file_path, workers=1)
+    instrument.configure(trace_memory=memory)
+    instrument.reset()
+    failed = collections.OrderedDict()
+    renders = []
+    for name in pipeline.plan():
+        stage = pipeline.stages[name]
+        if any(dep in failed for dep in stage.deps):
+            failed[name] = Measurement(0, 0, None, 'a dependency failed')
+        elif stage.render:
+            renders.append(name)
+        else:
+            gc.collect()
+            try:
+                pipeline.run_stage(name)
+            except Exception:
+                # recorded by instrument.measure()
+                failed[name] = None
+    if renders:
+        pipeline.render(renders, workers=1)
+
+    results = collections.OrderedDict(
+        (x['name'], Measurement(x['wall_seconds'], x['cpu_seconds'], x['peak_traced_mb'], 
+                                x['error'])) for x in instrument.records())
+    results.update((name, x) for name, x in failed.items() if x is not None)
+    return results
+
+def report(samples, results):
+    for name, (seconds, cpu, peak, error) in results.items():
+        if error:
+            print('{:>10d} {:<50} FAILED: {}'.format(samples, name, error))
+        else:
+            print('{:>10d} {:<50} {:>10.3f} {:>10.3f} {:>10}'.format(
+                samples, name, seconds, cpu, '-' if peak is None else '{:.1f}'.format(peak)))
+
+def main(sizes=(10**3, 10**4, 10**5), memory=True, directory=None, outfile=None, seed=0):
+    ''' Benchmark the stages for each number of samples.
+
+    Args:
+        directory: directory to write the synthetic inputs and outputs to,
+                   a temporary directory (which is removed) if None
+        outfile: CSV to write the measurements to
+    '''
+    # every run should parse and clean its inputs
+    input_cache.ENABLED = False
+    rows = []
+    print('{:>10} {:<50} {:>10} {:>10} {:>10}'.format('samples', 'stage', 'wall (s)',
+                                                      'cpu (s)', 'peak (MB)'))
+    for samples in sizes:
+        root = directory or tempfile.mkdtemp()
+        file_path = os.path.join(root, str(samples)) + '/'
+        try:
+            cohorts = write_synthetic_inputs(file_path + 'input_files/', samples, seed=seed)
+            results = benchmark_stages(file_path, cohorts, memory)
+        finally:
+            if directory is None:
+                shutil.rmtree(root)
+        report(samples, results)
+        rows += [(samples, name) + tuple(x) for name, x in results.items()]
+    if outfile:
+        pd.DataFrame(rows, columns=('samples', 'stage') + Measurement._fields).to_csv(
+            outfile, index=False)
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages against '
+                                                 'synthetic cohorts.')
+    parser.add_argument('--samples', type=int, nargs='+', default=[10**3, 10**4, 10**5],
+                        help='numbers of patients to benchmark (default: 1000 10000 100000)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not trace memory, tracing slows down each stage')
+    parser.add_argument('--dir', default=None,
+                        help='keep the synthetic inputs and outputs within this directory')
+    parser.add_argument('--outfile', default=None, help='CSV to write the measurements to')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: 0)')
+    return parser.parse_args(args)
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args.samples, memory=not args.no_memory, directory=args.dir, outfile=args.outfile,
+         seed=args.seed)
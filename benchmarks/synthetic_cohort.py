@@ -0,0 +1,344 @@
+''' Write synthetic cohort input files so the pipeline can be run, and
+    benchmarked, without patient data. Every cohort is given phenotype,
+    all variants, most damaging and (optionally) survival CSVs along with
+    a depth directory of GATK sample_summary files, laid out as described
+    in the README and listed in a cohorts.csv manifest. The data includes
+    duplicate samples (_2, _3, _pool7A and _pool10A), exons mangled into
+    dates by Excel (1/7 as 01-Jul), SKI exon 1 artefacts, negative controls
+    and samples below the depth threshold.
+
+    python3 benchmarks/synthetic_cohort.py OUTPUT_DIR --samples 100000
+'''
+import argparse
+import collections
+import os
+import numpy as np
+import pandas as pd
+import data_cleaning.cohorts as ch
+from data_cleaning import depth_store as ds
+
+# (cohort, raw sample column of the phenotype file, sample prefix, has survival data)
+SYNTHETIC_COHORTS = [
+    ('UK', 'Mendelian ID', '24UK', False),
+    ('Yale', 'YALE Coding', 'YL', True),
+]
+
+# gene, chrom, start, end, number of exons and relative variant frequency
+GENES = [
+    ('FBN1', 15, 48700503, 48937985, 65, 6),
+    ('SKI', 1, 2160134, 2241652, 7, 2),
+    ('TGFBR1', 9, 101867412, 101916474, 9, 1),
+    ('TGFBR2', 3, 30648376, 30735633, 8, 1),
+    ('SMAD3', 15, 67358195, 67487533, 9, 1),
+    ('ACTA2', 10, 90694831, 90751147, 9, 1),
+    ('MYH11', 16, 15797034, 15950887, 43, 3),
+    ('MYLK', 3, 123328896, 123603149, 34, 2),
+    ('COL3A1', 2, 189839099, 189877472, 51, 3),
+    ('SMAD4', 18, 48556583, 48611411, 12, 1),
+]
+# SKI exon 1, see data_cleaning/false_positive_regions.bed
+SKI_EXON1 = (1, 2160134, 2161174)
+
+# category, relative frequency, score range
+CATEGORIES = [
+    ('Pathogenic', 2, (90, 100)),
+    ('Likely Pathogenic', 3, (70, 90)),
+    ('Uncertain Significance', 35, (30, 70)),
+    ('Not Classified', 60, (0, 30)),
+]
+CONSEQUENCES = ['missense_variant', 'synonymous_variant', 'frameshift_variant',
+                'stop_gained', 'splice_region_variant', 'inframe_deletion']
+DUPLICATE_SUFFIXES = ['_2', '_3', '_pool7A', '_pool10A']
+NEGATIVE_CONTROLS = ['Blank', 'ddH2O', 'BLANK', 'H2O']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# raw phenotype column names (see rename.COLUMN_NAMES) and their choices
+PHENOTYPE_CHOICES = collections.OrderedDict([
+    ('Gender (Male/Female)', ['Male', 'Female', 'male', 'female', 'M', 'F', np.nan]),
+    ('Proven Family History of Aortic Disease (Yes/No)',
+     ['yes', 'no', 'No', 'Y', 'N', '-', 'unknown', np.nan]),
+    ('Probable Family History of Aortic Disease (Yes/No)',
+     ['yes', 'no', 'Yes', 'y', 'N', 'Marfan', 'unknown', np.nan]),
+    ('Primary Diagnosis  Presenting Indication (for surgery): Aneurysm / Dissection /'
+     '  Transection / IMH / PAU',
+     ['Aneurysm', 'aneurysm', 'Dissection', 'dissection', 'IMH', 'PAU', 'Transection', np.nan]),
+    ('Location of Primary Diagnosis  Ascending, Arch, Descending, Thoracoabdominal, '
+     'Infrarenal',
+     ['Ascending', 'ascending+arch', 'Arch', 'hemi arch', 'Descending',
+      'Descending thoracic', 'thoracoabdominal', 'Infrarenal', '?', np.nan]),
+    ('known syndrome - Marfan / LDS / EDS',
+     ['Marfan', 'LDS', 'EDS', 'BAV', np.nan, np.nan, np.nan, np.nan, np.nan, np.nan]),
+    ('Rupture (Y/N)', ['Y', 'N', 'N', 'N', np.nan]),
+])
+OPERATIONS = ['No.of Aortic Operations - Endovascular', 'No.of Aortic Operations - Open',
+              'No.of Aortic Operations - Hybrid']
+SURVIVAL_COLUMNS = ['Long-term mortality (0=no, 1=yes)',
+                    'Type of surgery (0=elective, 1=urgent/emergent)',
+                    'Peri-operative morality (0=no, 1=yes)']
+DEPTH_COLUMNS = ['sample_id', 'total', 'mean', 'granular_third_quartile', 'granular_median',
+                 'granular_first_quartile', '%_bases_above_15', '%_bases_above_49']
+
+def write_synthetic_inputs(input_dir, samples=1000, cohorts=SYNTHETIC_COHORTS, seed=0,
+                           batch_size=384):
+    ''' Write the input files of synthetic cohorts and their manifest.
+
+    Args:
+        input_dir: directory to write to i.e. TAAD_analysis/input_files/
+        samples: total number of patients, split evenly between the cohorts
+        cohorts: list of (cohort, sample column, sample prefix, survival) tuples
+        seed: seed of the random data
+        batch_size: number of samples per sample_summary file
+
+    Returns:
+        list of cohorts.Cohort read from the written manifest
+    '''
+    rng = np.random.RandomState(seed)
+    if not os.path.exists(input_dir):
+        os.makedirs(input_dir)
+    manifest = []
+    for i, (name, sample_column, prefix, survival) in enumerate(cohorts):
+        n = samples // len(cohorts) + (i < samples % len(cohorts))
+        cohort = ch.Cohort(name, '{}_Phenotype_Data.csv'.format(name),
+                           '{}_All_Variants_Data.csv'.format(name),
+                           '{}_Most_Damaging_Data.csv'.format(name), '{}_Depth'.format(name),
+                           '{}_Survival_Data_Clean.csv'.format(name) if survival else None)
+        write_cohort(input_dir, cohort, n, sample_column, prefix, rng, batch_size)
+        manifest.append(cohort)
+    pd.DataFrame(manifest, columns=ch.Cohort._fields).to_csv(
+        os.path.join(input_dir, ch.MANIFEST), index=False)
+    return ch.read_manifest(input_dir)
+
+def write_cohort(input_dir, cohort, n, sample_column, prefix, rng, batch_size=384):
+    ''' Write every input file of a single synthetic cohort of n patients.'''
+    patients = np.array(['{}{:07d}'.format(prefix, i) for i in range(n)], dtype=object)
+    duplicates = duplicate_samples(patients, rng)
+    controls = np.array(['{}{}'.format(rng.choice(NEGATIVE_CONTROLS), i)
+                         for i in range(n // 500 + 1)], dtype=object)
+    samples = np.concatenate([patients, duplicates, controls])
+
+    phenotype = synthetic_phenotype(patients, duplicates, controls, sample_column, rng)
+    phenotype.to_csv(os.path.join(input_dir, cohort.phenotype), index=False,
+                     encoding='iso-8859-1')
+    all_variants = synthetic_variants(samples, rng)
+    all_variants.to_csv(os.path.join(input_dir, cohort.all_variants), index=False,
+                        encoding='iso-8859-1')
+    most_damaging_variants(all_variants, samples).to_csv(
+        os.path.join(input_dir, cohort.most_damaging), index=False, encoding='iso-8859-1')
+    if cohort.survival:
+        synthetic_survival(patients, rng).to_csv(os.path.join(input_dir, cohort.survival),
+                                                 index=False, encoding='iso-8859-1')
+    write_depth(os.path.join(input_dir, cohort.depth), cohort.cohort,
+                synthetic_depth(samples, controls, rng), batch_size)
+
+def duplicate_samples(patients, rng, fraction=0.05):
+    ''' Names of the samples sequenced (or entered) twice, each of which is
+        a patients name suffixed with _2, _3, _pool7A or _pool10A.
+    '''
+    originals = rng.choice(patients, int(len(patients) * fraction), replace=False)
+    suffixes = rng.choice(DUPLICATE_SUFFIXES, len(originals))
+    return np.array([x + s for x, s in zip(originals, suffixes)], dtype=object)
+
+def synthetic_phenotype(patients, duplicates, controls, sample_column, rng):
+    ''' A phenotype DataFrame with the raw column names of the phenotype
+        files. Duplicates copy their patients phenotype with some missing and
+        conflicting fields, negative controls have no phenotype data.
+    '''
+    n = len(patients)
+    df = pd.DataFrame({sample_column: patients})
+    for column, choices in PHENOTYPE_CHOICES.items():
+        df[column] = rng.choice(np.array(choices, dtype=object), n)
+    age = rng.normal(55, 15, n).clip(5, 95).round()
+    df['Age at Diagnosis (any aortic disease)'] = np.where(rng.rand(n) < 0.05, np.nan, age)
+    df['Age at Time of Surgery'] = age + rng.randint(0, 10, n)
+    df['Maximal Aortic Size (cm) '] = np.where(rng.rand(n) < 0.1, np.nan,
+                                               rng.normal(5.5, 1, n).clip(3, 10).round(1))
+    df['Aortic Size at Diagnosis (primary location, earliest measurement) (cm)'] = \
+        rng.normal(4.8, 0.8, n).clip(3, 9).round(1)
+    for column in OPERATIONS:
+        df[column] = rng.choice([0, 0, 0, 1, 2, np.nan], n)
+
+    # duplicates repeat the patients phenotype, with a few gaps and conflicts
+    patient_rows = df.set_index(sample_column).loc[originals_of(duplicates)]
+    dups = patient_rows.reset_index(drop=True)
+    phenotype_columns = list(dups.columns)
+    missing = rng.rand(*dups.shape) < 0.1
+    dups = dups.mask(missing)
+    conflict = rng.rand(len(dups)) < 0.1
+    dups.loc[conflict, 'Age at Diagnosis (any aortic disease)'] += 1
+    dups.insert(0, sample_column, duplicates)
+
+    controls = pd.DataFrame({sample_column: controls}, columns=[sample_column] + phenotype_columns)
+    df = pd.concat([df, dups, controls], ignore_index=True)
+
+    # a few sample names are entered with stray spaces or dashes
+    stray = rng.rand(len(df)) < 0.02
+    df.loc[stray, sample_column] = df.loc[stray, sample_column].str.replace(
+        r'^(\D+)', r'\1 ', regex=True)
+    return df.sample(frac=1, random_state=rng)
+
+def originals_of(duplicates):
+    ''' The patient names of the duplicate samples.'''
+    # copied so the callers duplicate names keep their suffixes
+    names = pd.Series(duplicates).copy()
+    for suffix in DUPLICATE_SUFFIXES:
+        ends = names.str.endswith(suffix)
+        names[ends] = names[ends].str[:-len(suffix)]
+    return names.values
+
+def synthetic_variants(samples, rng):
+    ''' An all variants DataFrame with the raw columns of the genotype files.
+        Most samples have a few variants, some have none and around 2% of
+        variants are SKI exon 1 artefacts with a low allele balance.
+    '''
+    counts = rng.poisson(3, len(samples))
+    counts[rng.rand(len(samples)) < 0.08] = 0
+    n = counts.sum()
+    genes = np.array(GENES, dtype=object)
+    weights = genes[:, 5].astype(float)
+    gene = genes[rng.choice(len(genes), n, p=weights / weights.sum())]
+    chrom = gene[:, 1].astype(int)
+    pos = gene[:, 2].astype(np.int64) + (rng.rand(n) * (gene[:, 3] - gene[:, 2]).astype(
+        np.int64)).astype(np.int64)
+
+    # SKI exon 1 artefacts, usually with a low allele balance
+    artefact = rng.rand(n) < 0.02
+    gene[artefact] = genes[[x[0] for x in GENES].index('SKI')]
+    chrom[artefact] = SKI_EXON1[0]
+    pos[artefact] = rng.randint(SKI_EXON1[1], SKI_EXON1[2] + 1, artefact.sum())
+    exons = gene[:, 4].astype(int)
+    exon = 1 + (rng.rand(n) * exons).astype(int)
+    exon[artefact] = 1
+    # other SKI variants lie beyond exon 1, so annotation and region agree
+    ski = (gene[:, 0] == 'SKI') & ~artefact
+    pos[ski] = rng.randint(SKI_EXON1[2] + 1, gene[ski, 3].astype(np.int64) + 1)
+    exon[ski] = 2 + (rng.rand(ski.sum()) * (exons[ski] - 1)).astype(int)
+    ab = rng.beta(10, 10, n).round(3)
+    low_ab = (artefact & (rng.rand(n) < 0.8)) | (rng.rand(n) < 0.03)
+    ab[low_ab] = rng.uniform(0.02, 0.3, low_ab.sum()).round(3)
+
+    categories = np.array(CATEGORIES, dtype=object)
+    weights = categories[:, 1].astype(float)
+    which = rng.choice(len(categories), n, p=weights / weights.sum())
+    which[artefact & (rng.rand(n) < 0.5)] = 0
+    category = categories[which, 0]
+    low, high = np.array([list(x) for x in categories[which, 2]], dtype=float).T
+    score = (low + rng.rand(n) * (high - low)).round(2)
+    pathogenic = which < 2
+    validation = np.where(pathogenic, rng.choice([1, 1, 1, 2, 0], n), 0)
+
+    bases = np.array(list('ACGT'))
+    ref = bases[rng.randint(0, 4, n)]
+    alt = bases[(np.searchsorted(bases, ref) + rng.randint(1, 4, n)) % 4]
+    depth = rng.randint(20, 400, n)
+    alt_reads = (depth * ab).round().astype(int)
+    gene_index = pd.Index([x[0] for x in GENES]).get_indexer(gene[:, 0])
+    transcript = np.array(['ENST{:011d}'.format(i) for i in range(len(GENES))],
+                          dtype=object)[gene_index]
+    coding = pos - gene[:, 2].astype(np.int64)
+    consequence = rng.choice(CONSEQUENCES, n)
+    protein = np.where(consequence == 'synonymous_variant', np.nan,
+                       pd.Series(transcript).str.replace('ENST', 'ENSP').values +
+                       ':p.Arg' + (coding // 3).astype(str) + 'Gly')
+
+    df = pd.DataFrame(collections.OrderedDict([
+        ('Sample', np.repeat(samples, counts)),
+        ('AD', pd.Series(depth - alt_reads).astype(str).values + ',' + alt_reads.astype(str)),
+        ('AB', ab),
+        ('UID', pd.Series(chrom).astype(str).values + '_' + pos.astype(str) + '_' + ref + '_' + alt),
+        ('validated?(1=yes,2=no,0=not_done)', validation),
+        ('Category', category),
+        ('Score', score),
+        ('Symbol', gene[:, 0]),
+        ('HGVS', pd.Series(chrom).astype(str).values + ':g.' + pos.astype(str) + ref + '>' + alt),
+        ('Chrom', chrom),
+        ('Pos', pos),
+        ('Ref', ref),
+        ('Alt', alt),
+        ('Consequence', consequence),
+        ('HGVSc', transcript + ':c.' + coding.astype(str) + ref + '>' + alt),
+        ('HGVSp', protein),
+        ('Exon', exon_names(exon, exons, rng)),
+        ('Intron', '-'),
+    ]))
+    return df
+
+def exon_names(exon, exons, rng, mangled=0.1):
+    ''' Exon numbers as exon/exons e.g. 1/7, some of which have been turned
+        into dates by Excel e.g. 01-Jul.
+    '''
+    names = pd.Series(exon).astype(str).values + '/' + pd.Series(exons).astype(str).values
+    excel = (rng.rand(len(exon)) < mangled) & (exons <= 12)
+    months = np.array(MONTHS, dtype=object)[exons[excel] - 1]
+    names[excel] = [('{:02d}-{}'.format(e, m)) for e, m in zip(exon[excel], months)]
+    return names
+
+def most_damaging_variants(all_variants, samples):
+    ''' The highest scoring variant of each sample, samples without a variant
+        are given an empty row.
+    '''
+    ranked = all_variants.sort_values(['Sample', 'Score'], ascending=[True, False],
+                                      kind='mergesort')
+    most_damaging = ranked.drop_duplicates('Sample')
+    no_variant = ~pd.Series(samples).isin(most_damaging['Sample']).values
+    no_variant = pd.DataFrame({'Sample': samples[no_variant]}, columns=all_variants.columns)
+    return pd.concat([most_damaging, no_variant], ignore_index=True)
+
+def synthetic_survival(patients, rng):
+    ''' Survival data of the patients.'''
+    df = pd.DataFrame({'Sample': patients})
+    for column, p in zip(SURVIVAL_COLUMNS, [0.15, 0.3, 0.05]):
+        df[column] = np.where(rng.rand(len(df)) < 0.05, np.nan, rng.rand(len(df)) < p)
+    return df
+
+def synthetic_depth(samples, controls, rng):
+    ''' GATK sample_summary rows for every sample and assay. All samples are
+        sequenced with the X assay and most with the Z assay. Around 5% of
+        samples are below the depth threshold and negative controls have
+        no reads.
+    '''
+    rows = []
+    for assay, fraction in zip(ds.ASSAY_DIRS, [1.0, 0.7]):
+        sequenced = samples[rng.rand(len(samples)) < fraction]
+        n = len(sequenced)
+        total = rng.randint(10**6, 5 * 10**6, n)
+        total[pd.Series(sequenced).isin(controls).values] = 0
+        above_49 = np.where(rng.rand(n) < 0.05, rng.uniform(20, 80, n), rng.uniform(85, 100, n))
+        mean = rng.uniform(80, 400, n)
+        rows.append(pd.DataFrame(collections.OrderedDict([
+            ('sample_id', sequenced),
+            ('total', total),
+            ('mean', mean.round(2)),
+            ('granular_third_quartile', (mean * 1.3).astype(int)),
+            ('granular_median', mean.astype(int)),
+            ('granular_first_quartile', (mean * 0.7).astype(int)),
+            ('%_bases_above_15', np.minimum(above_49 + rng.uniform(0, 10, n), 100).round(1)),
+            ('%_bases_above_49', above_49.round(1)),
+        ])).assign(assay=assay))
+    return pd.concat(rows, ignore_index=True)
+
+def write_depth(depth_dir, cohort, depth, batch_size=384):
+    ''' Write the sample_summary files of each assay in batches of samples.'''
+    for assay, df in depth.groupby('assay'):
+        assay_dir = os.path.join(depth_dir, assay)
+        if not os.path.exists(assay_dir):
+            os.makedirs(assay_dir)
+        for batch, start in enumerate(range(0, len(df), batch_size)):
+            summary = os.path.join(assay_dir, '{}_batch{:05d}.sample_summary'.format(cohort, batch))
+            df[DEPTH_COLUMNS].iloc[start:start + batch_size].to_csv(summary, sep='\t',
+                                                                    index=False)
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='Write synthetic cohort input files.')
+    parser.add_argument('input_dir', help='directory to write the input files to')
+    parser.add_argument('--samples', type=int, default=1000,
+                        help='total number of patients (default: 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: 0)')
+    parser.add_argument('--batch-size', type=int, default=384,
+                        help='samples per sample_summary file (default: 384)')
+    return parser.parse_args(args)
+
+if __name__ == '__main__':
+    args = parse_args()
+    write_synthetic_inputs(args.input_dir, args.samples, seed=args.seed,
+                           batch_size=args.batch_size)
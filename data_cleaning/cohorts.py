@@ -0,0 +1,73 @@
+''' read_manifest() loads the cohort manifest, a CSV listing the input files
+    of every cohort, and map_cohorts() runs the per-cohort work for each
+    cohort in a process pool.'''
+from concurrent.futures import ProcessPoolExecutor
+from data_cleaning import instrument
+import collections
+import pandas as pd
+import os
+
+MANIFEST = 'cohorts.csv'
+
+# depth and survival are optional, every other file is required
+Cohort = collections.namedtuple('Cohort', ['cohort', 'phenotype', 'all_variants',
+                                           'most_damaging', 'depth', 'survival'])
+REQUIRED = ['cohort', 'phenotype', 'all_variants', 'most_damaging']
+
+# used when the input directory does not contain a manifest
+DEFAULT_MANIFEST = [
+    Cohort('UK', 'UK_Phenotype_Data.csv', 'UK_All_Variants_Data.csv',
+           'UK_Most_Damaging_Data.csv', 'UK_Depth', None),
+    Cohort('Yale', 'Yale_Phenotype_Data.csv', 'Yale_All_Variants_Data.csv',
+           'Yale_Most_Damaging_Data.csv', 'Yale_Depth', 'Yale_Survival_Data_Clean.csv'),
+]
+
+def read_manifest(input_dir, manifest=MANIFEST):
+    ''' Return a list of Cohorts from the manifest within the input
+        directory, or the UK and Yale cohorts if there is no manifest.
+        Relative paths are relative to the input directory.
+    '''
+    manifest_path = os.path.join(input_dir, manifest)
+    if os.path.exists(manifest_path):
+        df = pd.read_csv(manifest_path, dtype=str)
+        missing = [x for x in Cohort._fields if x not in df.columns]
+        if missing:
+            raise ValueError("{} is missing the columns: {}".format(
+                manifest_path, ', '.join(missing)))
+        df = df[list(Cohort._fields)].astype(object).where(df.notna(), None)
+        cohorts = [Cohort(*row) for row in df.itertuples(index=False)]
+    else:
+        cohorts = DEFAULT_MANIFEST
+    for cohort in cohorts:
+        empty = [x for x in REQUIRED if not getattr(cohort, x)]
+        if empty:
+            raise ValueError("cohort {} has no {}".format(cohort.cohort, ', '.join(empty)))
+    names = [x.cohort for x in cohorts]
+    if len(set(names)) != len(names):
+        raise ValueError("cohort names must be unique: {}".format(', '.join(names)))
+    return [resolve_paths(x, input_dir) for x in cohorts]
+
+def resolve_paths(cohort, input_dir):
+    ''' Return the cohort with its (non empty) file paths joined
+        to the input directory.
+    '''
+    paths = {x: os.path.join(input_dir, getattr(cohort, x))
+             for x in Cohort._fields[1:] if getattr(cohort, x)}
+    return cohort._replace(**paths)
+
+def input_files(cohorts, fields):
+    ''' Return the given files of every cohort e.g. ['phenotype', 'survival']'''
+    return [getattr(c, x) for c in cohorts for x in fields if getattr(c, x)]
+
+def map_cohorts(func, cohorts, *args, workers=None):
+    ''' Return func(cohort, *args) for each cohort, where args are
+        iterables with an item per cohort. Cohorts are processed in
+        separate processes unless workers is 1, the stages measured by
+        func within each process are added to this processes records.
+    '''
+    if workers is None:
+        workers = min(len(cohorts), os.cpu_count() or 1)
+    if workers <= 1:
+        return [func(*x) for x in zip(cohorts, *args)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return instrument.collected(pool.map(instrument.collect(func), cohorts, *args))
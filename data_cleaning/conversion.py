@@ -1,6 +1,23 @@
 ''' Functions which convert pandas DataFrame columns to various dtypes.'''
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# highly repetitive columns of the master DataFrames
+CATEGORY_COLUMNS = ['Symbol', 'Consequence', 'Category', 'New Category', 'cohort',
+                    'Chrom', 'Exon', 'Gender', 'primary diagnosis']
+# whole number columns
+INTEGER_COLUMNS = ['Pos', 'validation', 'New Category code',
+                   'No.of Aortic Operations - Endovascular',
+                   'No.of Aortic Operations - Open',
+                   'No.of Aortic Operations - Hybrid']
+# columns of unique strings stored with Arrow when pyarrow is available
+STRING_COLUMNS = ['HGVS', 'HGVSc', 'HGVSp']
+
 def convert2numeric(df, cols):
     ''' convert the parsed columns to numeric type'''
     df[cols] = df[cols].apply(lambda x: pd.to_numeric(x, errors='coerce'))
@@ -35,3 +52,106 @@ def convert2category(column, label_order):
     convert = column.astype("category")
     structured_cat = convert.cat.set_categories(label_order)
     return structured_cat
+
+def add_categories(column, values):
+    ''' Add any of the given values which are not already categories to a
+        category column, so they can be assigned or used with fillna. Columns
+        which are not categories are returned unaltered.
+    '''
+    if hasattr(column, 'cat'):
+        new = [x for x in values if x not in column.cat.categories]
+        if new:
+            column = column.cat.add_categories(new)
+    return column
+
+def normalise_categorical(column, canonicalise):
+    ''' Apply canonicalise to each distinct value in column once and broadcast
+        the result back to every row through categorical codes. 
+    Args:
+        column: Series to normalise
+        canonicalise: function which takes and returns a Series of values
+    Returns:
+        the normalised column as a category
+    '''
+    codes, uniques = pd.factorize(column)
+    # NaN is given the code -1 by factorize so append it as the last distinct value
+    distinct = pd.Series(list(uniques) + [np.nan], dtype=object)
+    codes = np.where(codes == -1, len(uniques), codes)
+    canonical_codes, categories = pd.factorize(canonicalise(distinct))
+    normalised = pd.Categorical.from_codes(canonical_codes[codes], categories)
+    return pd.Series(normalised, index=column.index, name=column.name)
+
+def union_categories(frames, cols):
+    ''' Give the category columns in each DataFrame the same categories so 
+        they remain categories when the DataFrames are concatenated. Columns
+        which are not a category in every DataFrame are skipped.
+    Args:
+        frames: list of DataFrames
+        cols: list of category columns present in each DataFrame
+    '''
+    for col in cols:
+        if not all(hasattr(df[col], 'cat') for df in frames):
+            continue
+        categories = pd.Index([])
+        for df in frames:
+            categories = categories.append(df[col].cat.categories).unique()
+        for df in frames:
+            df[col] = df[col].cat.set_categories(categories)
+    return frames
+
+def compact_frame(df, outfile=None):
+    ''' Reduce the memory used by the master DataFrames by converting
+        repetitive columns to categories, narrowing whole number columns
+        and storing HGVS strings with Arrow.
+    Args:
+        df: DataFrame
+        outfile: CSV file to write a per column memory report to
+    '''
+    before = column_memory(df)
+    for col in [x for x in CATEGORY_COLUMNS if x in df.columns]:
+        if not hasattr(df[col], 'cat'):
+            df[col] = df[col].astype('category')
+    for col in [x for x in INTEGER_COLUMNS if x in df.columns]:
+        df[col] = narrow_integer(df[col])
+    if pyarrow is not None:
+        for col in [x for x in STRING_COLUMNS if x in df.columns]:
+            df[col] = df[col].astype('string[pyarrow]')
+    report = memory_report(before, column_memory(df))
+    print("\nINFO: compacted DataFrame from {:.1f}MB to {:.1f}MB".format(
+        report.loc['Total', 'bytes before'] / 1e6, report.loc['Total', 'bytes after'] / 1e6))
+    if outfile:
+        report.to_csv(outfile)
+    return df
+
+def narrow_integer(column):
+    ''' Downcast a column of whole numbers to the smallest integer dtype.
+        Nullable integer columns (e.g. Pos) are narrowed to the smallest
+        nullable dtype. Float columns with missing values are left unaltered
+        as NA can't be used within boolean masks downstream.
+    '''
+    if not pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+        return column
+    values = column.dropna()
+    if len(values) == 0 or (values != values.round()).any():
+        return column
+    if isinstance(column.dtype, pd.api.extensions.ExtensionDtype):
+        for dtype in ['int8', 'int16', 'int32', 'int64']:
+            info = np.iinfo(dtype)
+            if values.min() >= info.min and values.max() <= info.max:
+                return column.astype(dtype.capitalize())
+    if column.isna().any():
+        return column
+    return pd.to_numeric(column, downcast='integer')
+
+def column_memory(df):
+    ''' Return the dtype and deep memory usage in bytes of each column'''
+    return pd.DataFrame({'dtype': df.dtypes.astype(str),
+                         'bytes': df.memory_usage(deep=True, index=False)},
+                        columns=['dtype', 'bytes'])
+
+def memory_report(before, after):
+    ''' Combine two column_memory() tables and add the total usage'''
+    report = before.join(after, lsuffix=' before', rsuffix=' after', how='left')
+    report.loc['Total'] = ['', report['bytes before'].sum(), '', report['bytes after'].sum()]
+    report['reduction (%)'] = (1 - report['bytes after'] / report['bytes before']) * 100
+    return report
@@ -0,0 +1,107 @@
+''' load_depth_store() and its helper functions consolidate the GATK 
+    sample_summary depth files for every cohort into a single on disk
+    store, only re-reading summary files which have changed since the
+    store was last updated.'''
+from concurrent.futures import ThreadPoolExecutor
+from data_cleaning import frame_store
+import pandas as pd
+import os
+
+# default cohort depth directories, see cohorts.read_manifest()
+COHORT_DIRS = {'UK': 'UK_Depth', 'Yale': 'Yale_Depth'}
+ASSAY_DIRS = ['depth_vs_taadx', 'depth_vs_taadz']
+STORE_DIR = '.depth_store'
+
+def load_depth_store(file_path, workers=None, cohort_dirs=COHORT_DIRS, 
+                     assay_dirs=ASSAY_DIRS):
+    ''' Return a DataFrame containing every sample_summary row for all
+        cohorts, updating the consolidated store beforehand.
+
+    Args:
+      file_path: absolute path to the input directory
+      workers: number of threads used to read changed files
+      cohort_dirs: dict of cohort name to depth directory
+      assay_dirs: assay sub-directories within each cohort directory
+
+    Returns:
+      DataFrame with sample_id, cohort, assay and source (summary file
+      relative to file_path) columns along with the GATK depth columns
+    '''
+    store_path = os.path.join(file_path, STORE_DIR)
+    current = summary_file_stats(file_path, cohort_dirs, assay_dirs)
+    depth, manifest = read_store(store_path)
+
+    # files that are unchanged can be served from the store
+    merged = current.merge(manifest, on='source', how='left', 
+                           suffixes=('', '_stored'))
+    unchanged = ((merged['size'] == merged['size_stored']) & 
+                 (merged['mtime'] == merged['mtime_stored']))
+    keep = set(merged.loc[unchanged, 'source'])
+    stale = merged[~unchanged]
+
+    # nothing added, changed or removed
+    if len(stale) == 0 and len(keep) == len(manifest):
+        return depth
+
+    print("\nINFO: reading {} new or changed depth files".format(len(stale)))
+    kept = depth[depth['source'].isin(keep)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fresh = list(pool.map(read_sample_summary, 
+                              [file_path]*len(stale),
+                              stale['source'], stale['cohort'], stale['assay']))
+    depth = pd.concat([kept] + fresh, ignore_index=True, sort=False)
+    write_store(store_path, depth, current)
+    return depth
+
+def summary_file_stats(file_path, cohort_dirs=COHORT_DIRS, assay_dirs=ASSAY_DIRS):
+    ''' Return a DataFrame of every sample_summary file alongside its
+        cohort, assay, size and modification time.
+    '''
+    rows = []
+    for cohort, direct in cohort_dirs.items():
+        for assay in assay_dirs:
+            assay_path = os.path.join(file_path, direct, assay)
+            if not os.path.isdir(assay_path):
+                continue
+            for entry in os.scandir(assay_path):
+                if entry.name.endswith("sample_summary"):
+                    stat = entry.stat()
+                    rows.append([os.path.join(direct, assay, entry.name),
+                                 cohort, assay, stat.st_size, stat.st_mtime_ns])
+    return pd.DataFrame(rows, columns=['source', 'cohort', 'assay', 'size', 'mtime'])
+
+def read_sample_summary(file_path, source, cohort, assay):
+    ''' Open a GATK sample_summary file and tag each row with
+        where it came from.
+    '''
+    df = pd.read_csv(os.path.join(file_path, source), sep="\t")
+    numeric = [x for x in df.columns if x != 'sample_id']
+    df[numeric] = df[numeric].apply(pd.to_numeric)
+    df['source'] = source
+    df['cohort'] = cohort
+    df['assay'] = assay
+    return df
+
+def read_store(store_path):
+    ''' Return the stored depth data and its file manifest, or empty
+        DataFrames if the store has yet to be created.
+    '''
+    depth_path = os.path.join(store_path, 'depth')
+    manifest_path = os.path.join(store_path, 'manifest')
+    if not (frame_store.frame_exists(depth_path) and 
+            frame_store.frame_exists(manifest_path)):
+        empty_manifest = pd.DataFrame(columns=['source', 'size', 'mtime'])
+        return (pd.DataFrame(columns=['source']), empty_manifest)
+    depth = frame_store.read_frame(depth_path)
+    manifest = frame_store.read_frame(manifest_path)
+    return (depth, manifest[['source', 'size', 'mtime']])
+
+def write_store(store_path, depth, manifest):
+    ''' Save the consolidated depth data and the manifest of the
+        files it was built from.
+    '''
+    if not os.path.exists(store_path):
+        os.makedirs(store_path)
+    frame_store.write_frame(depth.reset_index(drop=True), 
+                            os.path.join(store_path, 'depth'))
+    frame_store.write_frame(manifest, os.path.join(store_path, 'manifest'))
@@ -0,0 +1,87 @@
+''' A registry of genomic regions known to produce false positive variant
+    calls (e.g. SKI exon 1) loaded from a BED file. Variants are matched on
+    Chrom and Pos against a single interval index of all regions, so a
+    variant is flagged in one pass however many regions are registered.'''
+import numpy as np
+import pandas as pd
+import os
+
+# 0-based, half-open BED intervals of the false positive regions
+FALSE_POSITIVE_REGIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'false_positive_regions.bed')
+# variants with an allele balance below this are also false positives
+AB_THRESHOLD = 0.3
+
+# chromosomes are offset so all regions fit within one interval index
+CHROM_OFFSET = 2**32
+_registries = {}
+
+def read_regions(bed=FALSE_POSITIVE_REGIONS):
+    ''' Read the chrom, start, end and name columns of a BED file.'''
+    regions = pd.read_csv(bed, sep='\t', comment='#', header=None,
+                          usecols=[0, 1, 2, 3], names=['chrom', 'start', 'end', 'name'],
+                          dtype={'chrom': str, 'start': np.int64, 'end': np.int64, 'name': str})
+    regions['chrom'] = chrom_names(regions['chrom'])
+    return regions
+
+def region_registry(bed=FALSE_POSITIVE_REGIONS):
+    ''' Return the chromosome names and interval index of the regions
+        within a BED file. The index is built once per file.
+    '''
+    if bed not in _registries:
+        regions = read_regions(bed)
+        chroms = pd.Index(regions['chrom'].unique())
+        offset = chroms.get_indexer(regions['chrom']) * CHROM_OFFSET
+        # BED start is 0-based so (start, end] contains the 1-based positions
+        intervals = pd.IntervalIndex.from_arrays(regions['start'] + offset,
+                                                 regions['end'] + offset, closed='right')
+        _registries[bed] = (chroms, merge_overlapping(intervals))
+    return _registries[bed]
+
+def merge_overlapping(intervals):
+    ''' Merge overlapping intervals so that each position lies within at
+        most one interval, as required by IntervalIndex.get_indexer().
+    '''
+    intervals = intervals.sort_values()
+    left, right = [], []
+    for start, end in zip(intervals.left, intervals.right):
+        if left and start <= right[-1]:
+            right[-1] = max(right[-1], end)
+        else:
+            left.append(start)
+            right.append(end)
+    return pd.IntervalIndex.from_arrays(left, right, closed='right')
+
+def in_regions(df, bed=FALSE_POSITIVE_REGIONS):
+    ''' Return a boolean array marking the variants in df which lie within
+        a registered region.
+    '''
+    chroms, intervals = region_registry(bed)
+    chrom = chroms.get_indexer(chrom_names(df['Chrom']))
+    pos = pd.to_numeric(df['Pos'], errors='coerce')
+    known = (chrom >= 0) & pos.notna().values
+    if not known.any():
+        return known
+    key = chrom[known] * CHROM_OFFSET + pos.values[known].astype(np.int64)
+    flagged = known.copy()
+    flagged[known] = intervals.get_indexer(key) >= 0
+    return flagged
+
+def flag_false_positives(df, AB=AB_THRESHOLD, bed=FALSE_POSITIVE_REGIONS):
+    ''' Return a boolean array marking the variants in df which lie within a
+        false positive region or have an allele balance below AB.
+    '''
+    low_ab = pd.to_numeric(df['AB'], errors='coerce').values < AB
+    return in_regions(df, bed) | low_ab
+
+def chrom_names(column):
+    ''' Represent chromosomes as strings without a chr prefix so that, for
+        example, 1, 1.0, '1' and 'chr1' all match.
+    '''
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = chrom_names(pd.Series(column.cat.categories))
+        names = np.append(categories.values, 'nan')[column.cat.codes.values]
+        return pd.Series(names, index=column.index)
+    if pd.api.types.is_numeric_dtype(column):
+        column = column.astype('Int64')
+    return column.astype(str).str.replace('^chr', '', regex=True)
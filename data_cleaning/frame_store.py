@@ -0,0 +1,61 @@
+''' Read and write DataFrames to disk in a fast binary columnar format. Parquet
+    is used when pyarrow is installed, otherwise the DataFrame is pickled.'''
+import pandas as pd
+import os
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+EXTENSIONS = ('.parquet', '.pkl')
+
+def write_frame(df, path, parquet=True):
+    ''' Write a DataFrame to the given path (without extension) and
+        return the name of the file written.
+
+    Args:
+        df: DataFrame
+        path: file path without extension
+        parquet: if False always pickle, which round-trips object columns
+                 exactly (parquet will read NaN in string columns as None)
+    '''
+    remove_frame(path)
+    if parquet and pyarrow is not None:
+        try:
+            df.to_parquet(path + '.parquet')
+            return path + '.parquet'
+        except (pyarrow.ArrowException, TypeError, ValueError):
+            # mixed type object columns can't be stored as parquet
+            remove_frame(path)
+    df.to_pickle(path + '.pkl')
+    return path + '.pkl'
+
+def read_frame(path):
+    ''' Read a DataFrame written by write_frame() from the given
+        path (without extension).
+    '''
+    if os.path.exists(path + '.parquet'):
+        return pd.read_parquet(path + '.parquet')
+    elif os.path.exists(path + '.pkl'):
+        return pd.read_pickle(path + '.pkl')
+    raise FileNotFoundError("No stored DataFrame found at {}".format(path))
+
+def frame_file(path):
+    ''' Return the file a DataFrame has been written to for the
+        given path (without extension) or None if it doesn't exist.
+    '''
+    for ext in EXTENSIONS:
+        if os.path.exists(path + ext):
+            return path + ext
+    return None
+
+def frame_exists(path):
+    ''' True if a DataFrame has been written to the given path.'''
+    return frame_file(path) is not None
+
+def remove_frame(path):
+    ''' Delete any DataFrame stored at the given path.'''
+    for ext in EXTENSIONS:
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
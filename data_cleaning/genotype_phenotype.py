@@ -1,20 +1,45 @@
 ''' merge_genotype_phenotype() and it's helper functions merge the genotype and phenotype datasheets into one DataFrame'''
+import numpy as np
 import pandas as pd
+import os
 from data_cleaning import rename
+from data_cleaning import conversion
+from data_cleaning.input_cache import cached
 
-def merge_genotype_phenotype(phenotype, genotype):
+GENOTYPE_COLUMNS = ['Sample', 'AD', 'AB', 'UID', 'validation', 
+                    'Category', 'Score','Symbol', 'HGVS', 'Chrom', 
+                    'Pos', 'Ref', 'Alt', 'Consequence', 'HGVSc', 
+                    'HGVSp', 'Exon', 'Intron']
+
+GENOTYPE_DTYPES = {'Pos': 'Int64', 'AB': 'float64', 'Score': 'float64',
+                   'Symbol': 'category', 'Consequence': 'category', 
+                   'Category': 'category'}
+
+VARIANT_KEY = ['Chrom', 'Pos', 'Ref', 'Alt']
+
+# variants whose classification is overwritten during cleaning
+RECLASSIFIED_VARIANTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'reclassified_variants.csv')
+
+# set to 'pyarrow' (requires pyarrow) to parse the genotype CSVs with multiple threads
+CSV_ENGINE = 'c'
+
+@cached
+def merge_genotype_phenotype(phenotype, genotype, reclassified=RECLASSIFIED_VARIANTS):
     ''' Clean genotype and phenotype data and merge them
         on sample.
 
     Args:
         phenotype: path to phenotype data
         genotype: path to genotype data
+        reclassified: path to variant reclassification table
     '''
     phenotype_clean = clean_phenotype_data(phenotype)
-    genotype_clean = clean_genotype_data(genotype)
+    genotype_clean = clean_genotype_data(genotype, reclassified)
     merged = pd.merge(genotype_clean, phenotype_clean, on=['Sample'])
     return merged
 
+@cached
 def clean_phenotype_data(phenotype):
     ''' Clean the phenotype data.
     Args: 
@@ -39,39 +64,89 @@ def clean_phenotype_data(phenotype):
                                               substring=False)
     return pdf_clean
 
-def clean_genotype_data(genotype):
+@cached
+def clean_genotype_data(genotype, reclassified=RECLASSIFIED_VARIANTS, engine=CSV_ENGINE):
     ''' Clean the genotype data and filter for the
         genotype columns of interest
     Args:
         genotype: path to genotype file
+        reclassified: path to variant reclassification table
+        engine: pandas CSV parser engine, 'pyarrow' uses a multithreaded parser
     '''
-    genotype_columns = ['Sample', 'AD', 'AB', 'UID', 'validation', 
-                        'Category', 'Score','Symbol', 'HGVS', 'Chrom', 
-                        'Pos', 'Ref', 'Alt', 'Consequence', 'HGVSc', 
-                        'HGVSp', 'Exon', 'Intron']
-    gdf = pd.read_csv(genotype, encoding='iso-8859-1')
-    gdf_clean = rename.rename_columns(gdf)
-    mask = PLP2VUS(gdf_clean)
-    gdf_clean.ix[mask, 'Category'] = 'Uncertain Significance'
-    gdf_clean.ix[mask, 'New Category'] = 'VUS'
-    gdf_filtered = gdf_clean[genotype_columns]
+    gdf_clean = parse_genotype_data(genotype, engine=engine)
+    gdf_clean = reclassify_variants(gdf_clean, read_reclassification_table(reclassified))
+    gdf_filtered = gdf_clean[GENOTYPE_COLUMNS]
     return gdf_filtered
 
-def PLP2VUS(df):
-    ''' Mark variants to be converted to VUS classification.
-        These variants had insufficient evidence in HGMD to 
-        be truly classified as VUS.
+@cached
+def parse_genotype_data(genotype, engine=CSV_ENGINE):
+    ''' Read the genotype columns of interest and rename them. This is cached
+        separately so the files are not re-parsed when the reclassification
+        table changes, the cleaning of every sample is still repeated.
+    '''
+    gdf = read_genotype_csv(genotype, GENOTYPE_COLUMNS, GENOTYPE_DTYPES, engine)
+    return rename.rename_columns(gdf)
+
+def read_genotype_csv(genotype, columns, dtypes, engine=CSV_ENGINE):
+    ''' Read only the given columns from a genotype CSV file. The files
+        header is read first so that raw column names which rename_columns() 
+        converts to the given (clean) column names are also selected.
+    Args:
+        genotype: path to genotype file
+        columns: list of clean column names to read
+        dtypes: dict of clean column names and the dtype to parse them as
+        engine: pandas CSV parser engine
+    '''
+    header = pd.read_csv(genotype, encoding='iso-8859-1', nrows=0).columns
+    usecols = [x for x in header if rename.clean_column_name(x) in columns]
+    dtype = {x: dtypes[rename.clean_column_name(x)] for x in usecols
+             if rename.clean_column_name(x) in dtypes}
+    # dashes are used for missing values in numeric columns
+    na_values = {x: ['-'] for x, t in dtype.items() if t != 'category'}
+    return pd.read_csv(genotype, encoding='iso-8859-1', usecols=usecols, 
+                       dtype=dtype, na_values=na_values, engine=engine)
+
+def read_reclassification_table(reclassified):
+    ''' Open a table of variants to be reclassified. The table is keyed by
+        Chrom, Pos, Ref and Alt and every other column is a column to 
+        overwrite (e.g. Category). Ref and Alt may be blank to match any 
+        allele at the position.
+    '''
+    return pd.read_csv(reclassified, comment='#', 
+                       dtype={'Chrom': str, 'Pos': 'Int64', 'Ref': str, 'Alt': str})
+
+def reclassify_variants(df, table):
+    ''' Overwrite the classification of the variants in df found within the
+        reclassification table. Each variant is looked up once in a hash index
+        of the table, preferring an exact allele match over a position match.
+    '''
+    table = table.reset_index(drop=True)
+    wildcard = table['Ref'].isna() | table['Alt'].isna()
+    rows = variant_lookup(df, table[~wildcard], VARIANT_KEY)
+    rows = np.where(rows >= 0, rows, variant_lookup(df, table[wildcard], VARIANT_KEY[:2]))
+    hits = rows >= 0
+    print("\nINFO: {} variants reclassified".format(hits.sum()))
+    for col in [x for x in table.columns if x not in VARIANT_KEY]:
+        values = table[col].values[rows[hits]]
+        if col in df.columns:
+            df[col] = conversion.add_categories(df[col], pd.unique(values))
+        df.loc[hits, col] = values
+    return df
+
+def variant_lookup(df, table, key):
+    ''' Return the row label in table of each variant in df or -1 if the 
+        variant is not present.
+    '''
+    table = table.drop_duplicates(key, keep='last')
+    index = pd.MultiIndex.from_arrays([variant_key_column(table[x]) for x in key])
+    query = pd.MultiIndex.from_arrays([variant_key_column(df[x]) for x in key])
+    positions = index.get_indexer(query)
+    return np.append(table.index.values, -1)[positions]
+
+def variant_key_column(column):
+    ''' Represent a key column as strings so that, for example, Chrom 
+        parsed as an integer matches Chrom parsed as a string.
     '''
-    mask = (
-           ((df['Chrom'] == 2) & (df['Pos'] == 189851842)) |
-           ((df['Chrom'] == 3) & (df['Pos'] == 123401086)) |
-           ((df['Chrom'] == 9) & (df['Pos'] == 101908876)) |
-           ((df['Chrom'] == 15) & (df['Pos'] == 48760242)) |
-           ((df['Chrom'] == 15) & (df['Pos'] == 48776056)) |
-           ((df['Chrom'] == 15) & (df['Pos'] == 48644711)) |
-           ((df['Chrom'] == 16) & (df['Pos'] == 15844048)) |
-           ((df['Chrom'] == 15) & (df['Pos'] == 48782270)) |
-           ((df['Chrom'] == 15) & (df['Pos'] == 48800841)) |
-           ((df['Chrom'] == 15) & (df['Pos'] == 48829865))
-    )
-    return mask
+    if pd.api.types.is_numeric_dtype(column):
+        column = column.astype('Int64')
+    return column.astype(str)
@@ -0,0 +1,91 @@
+''' cached() stores the DataFrames returned by the functions which parse and
+    clean the cohort input files. Cached DataFrames are keyed by a hash of the
+    contents of the input files, the other arguments given and the source code
+    of the data_cleaning package, so unchanged inputs are loaded from the cache
+    instead of being re-parsed and re-cleaned.'''
+from data_cleaning import frame_store
+import functools
+import hashlib
+import inspect
+import glob
+import os
+
+ENABLED = True
+CACHE_DIR = '.cache'
+_file_hashes = {}
+_code_hash = None
+
+def cached(func):
+    ''' Decorator which caches the DataFrame returned by func in a cache
+        directory alongside the first input file parsed to func.
+    '''
+    signature = inspect.signature(func)
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # include default arguments e.g. a default lookup table
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())
+        files = [x for _, x in arguments if isinstance(x, str) and os.path.isfile(x)]
+        if not ENABLED or not files:
+            return func(*args, **kwargs)
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(files[0])), CACHE_DIR)
+        # entries for the same function and input files share a prefix
+        names = hashlib.sha1(repr([os.path.abspath(x) for x in files]).encode())
+        prefix = os.path.join(cache_dir, '{}_{}'.format(func.__name__, 
+                                                       names.hexdigest()[:12]))
+        path = '{}_{}'.format(prefix, cache_key(func, arguments))
+        if frame_store.frame_exists(path):
+            return frame_store.read_frame(path)
+        df = func(*args, **kwargs)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        # remove entries made from previous versions of the input files
+        for stale in glob.glob(prefix + '_*'):
+            os.remove(stale)
+        frame_store.write_frame(df, path, parquet=False)
+        return df
+    return wrapper
+
+def cache_key(func, arguments):
+    ''' Return a hash of the function, its arguments (input files are
+        represented by a hash of their contents) and the cleaning code.
+    '''
+    key = hashlib.sha1()
+    key.update('{}.{}'.format(func.__module__, func.__name__).encode())
+    key.update(code_hash().encode())
+    for name, arg in arguments:
+        key.update(name.encode())
+        if isinstance(arg, str) and os.path.isfile(arg):
+            key.update(file_hash(arg).encode())
+        else:
+            key.update(repr(arg).encode())
+    return key.hexdigest()
+
+def file_hash(path, chunk_size=2**20):
+    ''' Return a hash of the given files contents. Hashes are stored for 
+        the life of the process unless the files size or mtime changes.
+    '''
+    stat = os.stat(path)
+    memo = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo not in _file_hashes:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        _file_hashes[memo] = digest.hexdigest()
+    return _file_hashes[memo]
+
+def code_hash():
+    ''' Return a hash of the data_cleaning source code so changes to the
+        cleaning steps invalidate the cache.
+    '''
+    global _code_hash
+    if _code_hash is None:
+        digest = hashlib.sha1()
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for source in sorted(glob.glob(os.path.join(package_dir, '*.py'))):
+            with open(source, 'rb') as f:
+                digest.update(f.read())
+        _code_hash = digest.hexdigest()
+    return _code_hash
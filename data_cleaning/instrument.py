@@ -0,0 +1,196 @@
+''' measure() records the wall time, CPU time, peak memory and the number
+    of input and output rows of each named stage of the analysis, from the
+    merging of each cohort through to the plots, so a run can be saved as a
+    JSON report with write_report(). Stages may be nested (e.g. the steps of
+    most_damaging) and optionally profiled, writing a cProfile dump of each
+    outermost stage.'''
+from contextlib import contextmanager
+import pandas as pd
+import collections
+import functools
+import tracemalloc
+import cProfile
+import datetime
+import json
+import time
+import sys
+import os
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# trace the peak memory allocated within each stage, which slows every stage down
+TRACE_MEMORY = False
+# directory to write a cProfile dump of each stage to, stages are not profiled if None
+PROFILE_DIR = None
+
+_records = []
+# memory of the stages being measured in this process, outermost first
+_active = []
+_profiling = False
+
+def configure(trace_memory=TRACE_MEMORY, profile_dir=PROFILE_DIR):
+    ''' Set what is recorded for each stage measured in this process.'''
+    global TRACE_MEMORY, PROFILE_DIR
+    TRACE_MEMORY = trace_memory
+    PROFILE_DIR = profile_dir
+
+def options():
+    ''' The settings of this process, to configure() worker processes with.'''
+    return {'trace_memory': TRACE_MEMORY, 'profile_dir': PROFILE_DIR}
+
+@contextmanager
+def stage(name):
+    ''' Measure the enclosed block as the named stage and record it when the
+        block exits, even if it raises.
+
+    Yields:
+        the record of the stage, a dict to which rows_in and rows_out
+        may be added
+    '''
+    global _profiling
+    record = collections.OrderedDict([
+        ('name', name), ('pid', os.getpid()), ('wall_seconds', None), ('cpu_seconds', None),
+        ('peak_traced_mb', None), ('max_rss_mb', None), ('rows_in', None),
+        ('rows_out', None), ('profile', None), ('error', None)])
+    tracing = TRACE_MEMORY and start_tracing()
+    profiler = None
+    if PROFILE_DIR and not _profiling:
+        # only one profiler can be active, so nested stages are part of their parents dump
+        profiler, _profiling = cProfile.Profile(), True
+        profiler.enable()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = '{}: {}'.format(type(e).__name__, e)
+        raise
+    finally:
+        record['wall_seconds'] = time.perf_counter() - start
+        record['cpu_seconds'] = time.process_time() - cpu_start
+        if profiler:
+            profiler.disable()
+            _profiling = False
+            record['profile'] = write_profile(profiler, name)
+        if tracing:
+            record['peak_traced_mb'] = stop_tracing() / 1e6
+        record['max_rss_mb'] = max_rss_mb()
+        _records.append(record)
+
+def measure(name, func, *args, **kwargs):
+    ''' Call func as the named stage and return its result. The rows of the
+        DataFrames parsed to func and the rows of the DataFrame returned are
+        recorded.
+    '''
+    with stage(name) as record:
+        record['rows_in'] = count_rows(list(args) + list(kwargs.values()))
+        result = func(*args, **kwargs)
+        record['rows_out'] = count_rows([result])
+    return result
+
+def count_rows(values):
+    ''' Total rows of the DataFrames (or Series) within values, or None if
+        there are none.
+    '''
+    frames = [x for x in values if isinstance(x, (pd.DataFrame, pd.Series))]
+    frames += [y for x in values if isinstance(x, (list, tuple))
+               for y in x if isinstance(y, (pd.DataFrame, pd.Series))]
+    return sum(len(x) for x in frames) if frames else None
+
+def start_tracing():
+    ''' Start tracing memory for a stage, the peak of the stage is measured
+        from the memory allocated when it starts.
+    '''
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    current, peak = tracemalloc.get_traced_memory()
+    if _active:
+        _active[-1]['peak'] = max(_active[-1]['peak'], peak)
+    _active.append({'start': current, 'peak': current, 'started': started})
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    return True
+
+def stop_tracing():
+    ''' Return the peak bytes allocated during the innermost stage, passing
+        the peak on to its parent stage.
+    '''
+    peak = max(_active[-1]['peak'], tracemalloc.get_traced_memory()[1])
+    memory = _active.pop()
+    if _active:
+        _active[-1]['peak'] = max(_active[-1]['peak'], peak)
+    if memory['started']:
+        tracemalloc.stop()
+    return peak - memory['start']
+
+def max_rss_mb():
+    ''' The largest resident set size of this process so far, None if this
+        is unknown (i.e. on Windows).
+    '''
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux and bytes on macOS
+    return rss / 1e6 if sys.platform == 'darwin' else rss / 1e3
+
+def write_profile(profiler, name):
+    ''' Write a stages cProfile dump, which can be read with pstats.'''
+    if not os.path.exists(PROFILE_DIR):
+        os.makedirs(PROFILE_DIR)
+    path = os.path.join(PROFILE_DIR, '{}.prof'.format(name))
+    profiler.dump_stats(path)
+    return path
+
+def records():
+    ''' The records of every stage measured (or collected) in this process.'''
+    return list(_records)
+
+def extend(records):
+    ''' Add records measured within another process.'''
+    _records.extend(records)
+
+def reset():
+    ''' Discard the records of this process.'''
+    del _records[:]
+
+def collecting(func, settings, *args):
+    ''' Call func in a worker process with this processes settings and
+        return its result along with the records of the stages it measured,
+        see collect().
+    '''
+    configure(**settings)
+    reset()
+    result = func(*args)
+    return (result, records())
+
+def collect(func):
+    ''' Wrap func for a process pool so that the stages measured by func are
+        returned to this process. Pair with collected().
+    '''
+    return functools.partial(collecting, func, options())
+
+def collected(results):
+    ''' Add the records returned by each collect() call and return the
+        results of func.
+    '''
+    results = list(results)
+    for result, measured in results:
+        extend(measured)
+    return [result for result, measured in results]
+
+def write_report(outfile, **details):
+    ''' Write every record to a JSON run report.
+
+    Args:
+        details: further items of the report e.g. the targets of the run
+    '''
+    report = collections.OrderedDict([('created', datetime.datetime.now().isoformat()),
+                                      ('trace_memory', TRACE_MEMORY),
+                                      ('profile_dir', PROFILE_DIR)])
+    report.update(details)
+    report['stages'] = _records
+    with open(outfile, 'w') as out:
+        json.dump(report, out, indent=2, default=str)
+    return outfile
@@ -1,102 +1,145 @@
-''' create_new_columns() and its helper functions are used to produce new columns.'''
+''' create_new_columns() and its helper functions are used to produce new columns.
+    Each new column is described by a table of rules; a rule is a list of 
+    (column, operator, value) conditions which must all be met for the rules
+    output to be used. A condition on several columns gives a tuple of
+    column names and its operator is passed a DataFrame of those columns.
+    Rules are evaluated in order over whole columns and the first rule met
+    for a row determines its value.'''
+from data_cleaning import conversion
+from data_cleaning import false_positives
+import numpy as np
+import pandas as pd
+import operator
+
+OPS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda col, val: col.isin(val),
+    "isna": lambda col, val: col.isna(),
+    "contains": lambda col, val: col.str.contains(val, regex=False, na=False),
+    "in regions": lambda cols, bed: false_positives.in_regions(cols, bed),
+}
+
+# variants within a known false positive region e.g. SKI exon 1
+FALSE_POSITIVE = (('Chrom', 'Pos'), 'in regions', false_positives.FALSE_POSITIVE_REGIONS)
+
+FAMILY_HISTORY_RULES = [
+    ([('probable', 'in', ['yes', 'y', 'marfan'])], 'yes'),
+    ([('proven', 'in', ['yes', 'y', 'marfan'])], 'yes'),
+    ([('probable', '==', 'unknown'), ('proven', '!=', 'no')], 'unknown'),
+    ([('proven', '==', 'unknown'), ('probable', '!=', 'no')], 'unknown'),
+    ([('probable', '==', 'no')], 'no'),
+    ([('proven', '==', 'no')], 'no'),
+]
+
+AGE_GROUP_RULES = [
+    ([('age at diagnosis', '<', 50)], 'Under 50'),
+    ([('age at diagnosis', '>=', 50)], 'Over 50'),
+]
+
+SIMPLE_LOCATION_RULES = [
+    ([('location of primary diagnosis', 'contains', 'Ascending')], 'Ascending'),
+]
+
+NEW_CATEGORY_RULES = {
+    # P/LP, VUS & Likely Benign / No Variant
+    True: [
+        ([FALSE_POSITIVE], 'Likely Benign / No Variant'),
+        ([('Category', 'in', ['Pathogenic', 'Likely Pathogenic'])], 
+         'Pathogenic/Likely Pathogenic'),
+        ([('Category', '==', 'Not Classified')], 'Likely Benign / No Variant'),
+        ([('Category', '==', 'Uncertain Significance')], 'VUS'),
+        ([('Category', 'isna', None)], 'Likely Benign / No Variant'),
+        ([('Category', 'in', ['nan', 'No Variant'])], 'Likely Benign / No Variant'),
+    ],
+    # P/LP & Likely Benign / No Variant
+    False: [
+        # only SKI exon 1 variants whose exon was converted to a date by Excel
+        ([('Symbol', '==', 'SKI'), ('Exon', '==', '01-Jul')], 
+         'Likely Benign / No Variant'),
+        ([('Category', 'in', ['Uncertain Significance', 'Not Classified'])], 
+         'Likely Benign / No Variant'),
+        ([('Category', 'in', ['Pathogenic', 'Likely Pathogenic'])], 
+         'Pathogenic/Likely Pathogenic'),
+    ]
+}
+
+# ordered (old, new) substring replacements for the location of primary diagnosis
+LOCATION_REPLACEMENTS = [
+    ("+", "/"), (" ", ""), ("ascending", "Ascending"), ("descending", "Descending"),
+    ("arch", "Arch"), ("hemi", "Hemi"), ("Thoracoabdomen", "Thoracoabdominal"),
+    ("Descending/PAU", "Descending"), ("Arch-stageI", "Arch"), ("aneurysm", "-"),
+    ("Descendingthoracic", "Descending"), ("AorticValveReplacement", "-")
+]
 
 def create_new_columns(df, three_categories=True):
     ''' Utilise the below functions to alter existing and create 
         new columns required for the TAAD analysis.
     '''
-    df['family_history'] = df.apply(determine_family_history, axis=1)
-    df['Age Group'] = df.apply(determine_young_old, axis=1)
-    df['location of primary diagnosis'] = df.apply(plus2slash,axis=1)
-    df['location of primary diagnosis'] = df['location of primary diagnosis'].astype(str)
-    df['simple location of primary diagnosis'] = df.apply(simple_location_primary_diagnosis, axis=1)
+    df['family_history'] = determine_family_history(df)
+    df['Age Group'] = derive_column(df, AGE_GROUP_RULES, default="-")
+    df['location of primary diagnosis'] = conversion.normalise_categorical(
+        df['location of primary diagnosis'], lambda x: plus2slash(x).astype(str))
+    df['simple location of primary diagnosis'] = derive_column(df, SIMPLE_LOCATION_RULES, 
+                                                               default="Not Ascending")
+    df['New Category'] = derive_column(df, NEW_CATEGORY_RULES[three_categories], 
+                                       default=df['Category'])
     if three_categories:
-        df['New Category'] = df.apply(lambda x: determine_new_category(x, three_categories=True), axis=1)
         df['New Category code'] = df['New Category'].replace({'Likely Benign / No Variant': 1, 
                                                               'VUS': 2, 
                                                               'Pathogenic/Likely Pathogenic': 3})
     else:
-        df['New Category'] = df.apply(determine_new_category, axis=1)
         df['New Category code'] = df['New Category'].replace({'Likely Benign / No Variant': 1, 
                                                               'Pathogenic/Likely Pathogenic': 2})
     return df
 
-def determine_family_history(x):
+def derive_column(df, rules, default=None):
+    ''' Evaluate a table of rules over the whole df and return a Series 
+        containing the output of the first rule met by each row.
+
+    Args:
+        rules: list of ([(column, operator, value), ...], output) tuples
+        default: value (or Series) used for rows which meet no rule
+    '''
+    conditions = []
+    for rule, output in rules:
+        mask = np.ones(len(df), dtype=bool)
+        for col, op, val in rule:
+            values = df[list(col)] if isinstance(col, tuple) else df[col]
+            mask &= np.asarray(OPS[op](values, val), dtype=bool)
+        conditions.append(mask)
+    outputs = [output for rule, output in rules]
+    if isinstance(default, pd.Series):
+        default = default.values
+    derived = np.select(conditions, outputs, default=np.asarray(default, dtype=object))
+    return pd.Series(derived, index=df.index, dtype=object)
+
+def determine_family_history(df):
     ''' Decide what the family_history column will contain for 
         each row by evaluating both probable and proven history.
     '''
-    both = (x['probable family_history'].lower(), x['proven family_history'].lower())
-    if 'yes' in both or 'y' in both:
-        return 'yes'
-    elif 'Marfan' in both or 'marfan' in both:
-        return 'yes'
-    elif 'unknown' in both and both[0] != 'no' and both[1] != 'no':
-        return 'unknown'
-    elif both[0] == 'no' or both[1] =='no':
-        return 'no'
-    else:
-        print("Unable to determine family_history for{}\n{}".format(x['Sample'], both))
-     
-def determine_young_old(x):
-    ''' Designate a sample young or old depending upon the age
-        of the patient when diagnosed
-    '''
-    x = x['age at diagnosis']
-    if x < 50:
-        return 'Under 50'
-    elif x >= 50:
-        return 'Over 50'
-    else:
-        return "-"
-    
-def determine_new_category(x, three_categories=False):
-    ''' Depending upon what the Category value, 
-        decide which New Category value to return
-    Args:
-        three_categories: if True then P/LP, VUS & Likely Benign / No Variant
-    '''    
-    if three_categories is True:
-        if (x['Symbol'] == 'SKI' and x['Exon'] == "1/7") or (x['Symbol'] == 'SKI' and x['Exon'] == "01-Jul"):
-            return "Likely Benign / No Variant"
-        elif x['Category'] == "Pathogenic" or x['Category'] == "Likely Pathogenic":
-            return "Pathogenic/Likely Pathogenic"
-        elif x['Category'] == 'Not Classified':
-            return "Likely Benign / No Variant"
-        elif x['Category'] == 'Uncertain Significance':
-            return 'VUS'
-        elif str(x['Category']) == 'nan' or x['Category'] == 'No Variant':
-            return "Likely Benign / No Variant"
-        else:
-            return x['Category']
-    else:
-        if x['Symbol'] == 'SKI' and x['Exon'] == "01-Jul":
-            return "Likely Benign / No Variant"
-        elif x['Category'] in ('Uncertain Significance', 'Not Classified'):
-            return 'Likely Benign / No Variant'
-        elif x['Category'] == "Pathogenic" or x['Category'] == "Likely Pathogenic":
-            return "Pathogenic/Likely Pathogenic"
-        else:
-            return x['Category']
+    both = pd.DataFrame({'probable': df['probable family_history'].str.lower(),
+                         'proven': df['proven family_history'].str.lower()})
+    family_history = derive_column(both, FAMILY_HISTORY_RULES, default=np.nan)
+    undetermined = family_history.isna()
+    if undetermined.any():
+        print("Unable to determine family_history for {}".format(
+            ', '.join(df.loc[undetermined, 'Sample'].astype(str))))
+    return family_history
 
-def simple_location_primary_diagnosis(x):
-    ''' Simplify the location of the primary diagnosis
-        to two options: Ascending and Not Ascending
-    '''
-    x = x['location of primary diagnosis']
-    if "Ascending" in x:
-        return "Ascending"
-    elif "Ascending" not in x:
-        return "Not Ascending"
-    else:
-        return x
-        
-def plus2slash(x):
+def plus2slash(location):
     ''' Rename a string so that any plus characters or ambigouse names are converted to an approriate
-        charcter/string in the location of primary diagnosis fields.
+        charcter/string in the location of primary diagnosis fields. Non string entries are returned
+        unaltered.
     '''
-    location = x['location of primary diagnosis']
-    if isinstance(location, str):
-        # This variables contents is cancer for the eyes - change it perhaps using a dict
-        convert = location.replace("+", "/").replace(" ", "").replace("ascending", "Ascending").replace("descending", "Descending").replace("arch", "Arch").replace("hemi", "Hemi").replace("Thoracoabdomen","Thoracoabdominal").replace("Descending/PAU", "Descending").replace("Arch-stageI", "Arch").replace("aneurysm", "-").replace("Descendingthoracic", "Descending").replace("AorticValveReplacement", "-")
-        return convert
-    else:
+    if location.dtype != object and not pd.api.types.is_string_dtype(location):
         return location
+    convert = location
+    for old, new in LOCATION_REPLACEMENTS:
+        convert = convert.str.replace(old, new, regex=False)
+    # .str methods return NaN for non string entries
+    return convert.where(convert.notna(), location)
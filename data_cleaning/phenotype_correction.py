@@ -1,15 +1,17 @@
 ''' phenotype_resolver() and it's helper functions checks and resolves duplicate samples that have different values in their phenotype fields '''
 import numpy as np
+import pandas as pd
 
-def phenotype_resolver(df, phenotype_columns):
+def phenotype_resolver(df, phenotype_columns, diff_outfile=None):
     ''' Differences in phenotype data between duplicate samples are corrected/reported
         and any samples that subsequently have no phenotype data are removed.
 
     Args:
         phenotype_columns: a list of phenotype columns 
+        diff_outfile: CSV file to report unresolved duplicate differences to
     '''
     # duplicate samples with different phenotype information are dealt with here
-    df = duplicate_column_checker(df, phenotype_columns)
+    df = duplicate_column_checker(df, phenotype_columns, diff_outfile=diff_outfile)
 
     # get index numbers for all phenotype columns and filter out rows that have no phenotype data
     pheno_col_ix = [df.columns.get_loc(x) for x in phenotype_columns]
@@ -19,106 +21,91 @@ def phenotype_resolver(df, phenotype_columns):
 
     return df
 
-def duplicate_column_checker(df, columns_names, order=False, recurs=2, 
+def duplicate_column_checker(df, columns_names, 
                              dup_ends=['_2','_3', '_pool7A', '_pool10A'],
-                             column="Sample"):
+                             column="Sample", diff_outfile=None):
     ''' Identify duplicate samples and verify whether they have the same data stored in the given columns.
         If one duplicate has NaN in its phenotype fields then copy the phenotype data from the
         other duplicate sample. If there are still differences between them, then report to user.
 
     Args:
       column_names: a list of column names to be investigated for differences between duplicates
-      order: ascending - True or False
-      recurs: utilised to stop the recursive function
       dup_end: characters which seperate the original and duplicate sample
       column: column in which to search & identify whether samples are duplicates
+      diff_outfile: CSV file to report duplicates which still have differences to
 
     Returns:
       a dataframe in which the duplicates differences in the given columns have been resolved
       and/or communicated to the user
     '''
-    if recurs < 1:
-        return df
-
     # replace all dashes with NaN
     df = df.replace('-', np.nan)
 
     # Identify which samples are duplicates and fill in a new column with the original samples name. This way all duplicates 
     # have the orginal sample name in its row.
-    for dup in dup_ends:
-        cond = ((df[column].str.endswith(dup)) & (df[column].str.len() > 4))
-        df.ix[cond, 'same'] = df.ix[cond, column].str[:-(len(dup))]
-
-    # replace NaN in same by entries in column
-    df.same = df.same.combine_first(df[column])
-
-    # sort columns first on same then column. column is reversed upon the funcs recursion
-    df = df.sort_values(by=['same', column], ascending=[False, order]).reset_index()
-
-    # get the clumn indexes for the given column names
-    col_ix = [df.columns.get_loc(x) for x in columns_names]
-
-    # assess whether the sample names in a row and the following row are duplicates and, if so, forward fill the fields 
-    # described in column names
-    for num in range(0, df.shape[0]-1):
+    df['same'] = original_sample_names(df[column], dup_ends)
 
-        current_sam = df['same'].shift(-(num))[0]
-        next_sam = df['same'].shift(-(num+1))[0]
+    # sort on same then column so each duplicate group is ordered by sample name
+    df = df.sort_values(by=['same', column], ascending=[False, True]).reset_index(drop=True)
 
-        if current_sam == next_sam:
-
-            df.iloc[num:num+2, col_ix] = df.iloc[num:num+2, col_ix].ffill(limit=1)
+    # within each group of duplicates fill NaN fields described in column names with the next
+    # valid value and then fill any remaining trailing NaN with the last valid value of the group
+    df[columns_names] = df.groupby('same', sort=False)[columns_names].bfill()
+    df[columns_names] = df.groupby('same', sort=False)[columns_names].ffill()
 
     # report duplicates that still have different phenotype data
-    if recurs == 1:
-        duplicates_column_diff(df, col_ix, column)
-
-    # remove column index
-    df.drop(['index'], axis=1, inplace=True)
+    duplicates_column_diff(df, columns_names, column, outfile=diff_outfile)
 
-    # do the same but reverse the order of secondary order
-    return duplicate_column_checker(df, columns_names, order=True, recurs=recurs-1, dup_ends=dup_ends)
+    return df
 
-def duplicates_column_diff(df, col_ix, column):
-    ''' Find duplicate samples and communicate whether they have different in values in the given column indexes.
+def original_sample_names(samples, dup_ends):
+    ''' Return a Series of sample names with the given duplicate 
+        suffixes removed.
 
     Args:
-      col_ix: a list of column indexes to be investigated for differences between duplicate samples
-      column: column name which will used to search and identify whether samples are duplicates
-
-    Returns:
-      a CSV file containing differnces in the given column indexes along with the column names in which there are 
-      differences present
+      samples: Series of sample names
+      dup_ends: characters which seperate the original and duplicate sample
     '''
-    # store names of duplicates that have differences in phenotypes
-    diff_entries = []
-
-    # unfortunately this would not work within duplicate_column_checker()
-    for num in range(0, df.shape[0]-1):
-
-        current_sam = df[column].shift(-(num))[0]
-        next_sam = df[column].shift(-(num+1))[0]
-
-        current_entries = df.iloc[num, col_ix].tolist()
-        next_entries = df.iloc[num+1, col_ix].tolist()
-
-        header_entries = df.columns[col_ix]
-
-        if current_sam == next_sam:
-
-            # something here to report phenotype differences between duplicates
-            if num+2 <= df.shape[0]:
+    same = pd.Series(np.nan, index=samples.index, dtype=object)
+    for dup in dup_ends:
+        cond = ((samples.str.endswith(dup)) & (samples.str.len() > 4))
+        same[cond] = samples[cond].str[:-(len(dup))]
+    # samples that are not duplicates keep their name
+    return same.combine_first(samples)
 
-                # required as NaN does not equal NaN
-                df = df.fillna("-")
+def duplicates_column_diff(df, columns_names, column="Sample", group_column='same', outfile=None):
+    ''' Find groups of duplicate samples that have different values in the given columns.
 
-                if current_entries != next_entries:
-                    differences = [c for x, z, c in zip(current_entries, next_entries, header_entries)
-                                   if str(x) != str(z)]
-                    diff_entries.append([current_sam, next_sam] + differences)
+    Args:
+      columns_names: a list of column names to be investigated for differences between duplicate samples
+      column: column containing the sample names
+      group_column: column containing the original sample name shared by all of its duplicates
+      outfile: CSV file to write the differences to
 
-    # save a file which describes the duplicate samples that have different info in the given column indexes
-    # pd.DataFrame(data=diff_entries).to_csv(file_path+"error_diff_duplicate_entries_data.csv")
+    Returns:
+      a DataFrame with one row per duplicate group that has differences, detailing the samples
+      within the group and the column names in which there are differences present
+    '''
+    # only groups containing more than one sample can differ
+    dups = df[df.duplicated(group_column, keep=False)]
+
+    # compare as strings as NaN does not equal NaN
+    n_values = dups[columns_names].astype(str).groupby(dups[group_column], sort=False).nunique()
+    conflicts = (n_values > 1).reset_index().melt(id_vars=group_column, var_name='column', 
+                                                  value_name='conflict')
+    conflicts = conflicts[conflicts['conflict']]
+
+    diff = conflicts.groupby(group_column, sort=False)['column'].agg(', '.join).to_frame('Conflicting Columns')
+    diff['Number of Conflicts'] = conflicts.groupby(group_column, sort=False).size()
+    samples = dups.groupby(group_column, sort=False)[column].agg(', '.join)
+    diff.insert(0, 'Samples', samples.reindex(diff.index))
+    diff.index.name = column
+    print("\nINFO: {} duplicate samples have differing phenotype data\n".format(len(diff)))
+
+    # save a file which describes the duplicate samples that have different info in the given columns
+    if outfile:
+        diff.to_csv(outfile)
+    return diff
 
 def phenotype_data(x, col_ix):
     ''' Check whether we have any data in the fields in the given column indexes.
@@ -1,31 +1,108 @@
-''' A collection of filtering functions. '''
+''' A collection of filtering functions. Each named predicate (see
+    PREDICATES) is evaluated once per DataFrame as a boolean mask which is
+    cached against the frame, so masks can be requested repeatedly and
+    combined with & | ~ rather than filtering copies of the DataFrame.'''
+from data_cleaning import false_positives
+import pandas as pd
+import weakref
 
-def no_SKI_exon1(df):
-    ''' Remove SKI exon 1 variants from the dataframe'''
-    no_SKI = df[df.apply(lambda x: x['Symbol'] != "SKI" or x['Exon'] != "1/7", axis=1)]
-    no_SKI = no_SKI[no_SKI.apply(lambda x: x['Symbol'] != "SKI" or x['Exon'] != "01-Jul", axis=1)]
-    return no_SKI
+PATHOGENIC_CATEGORIES = ["Pathogenic", "Likely Pathogenic", "Pathogenic/Likely Pathogenic"]
+NEGATIVE_CONTROLS = "Blank|blank|ddH20|dH2O|H2O|BLANK|ddh2o"
+
+# predicate name: (columns read, function returning the rows which match)
+PREDICATES = {
+    'validated': (['validation'], lambda df: df['validation'] == 1),
+    'pathogenic': (['New Category'], lambda df: df['New Category'].isin(PATHOGENIC_CATEGORIES)),
+    'vus': (['New Category'], lambda df: df['New Category'] == 'VUS'),
+    'false_positive_region': (['Chrom', 'Pos'], false_positives.in_regions),
+    'negative_control': (['Sample'], lambda df: df['Sample'].str.contains(NEGATIVE_CONTROLS)),
+}
+
+# id(df): {predicate name: (version, mask)}, entries are removed with the frame
+_masks = {}
+
+def mask(df, name):
+    ''' Return a boolean Series marking the rows of df matching the named
+        predicate, missing values do not match. The mask is cached against
+        the frame and the arrays of the columns it reads, so it is rebuilt
+        if those columns (or the index) are replaced. Call invalidate()
+        after setting their values in place.
+
+    Args:
+        df: DataFrame
+        name: a key of PREDICATES e.g. 'validated'
+
+    Returns:
+        boolean Series with the index of df e.g.
+        df[mask(df, 'pathogenic') & ~mask(df, 'validated')]
+    '''
+    if name not in PREDICATES:
+        raise ValueError("Unknown filter {}, must be one of: {}".format(
+            name, ', '.join(sorted(PREDICATES))))
+    columns, predicate = PREDICATES[name]
+    version = frame_version(df, columns)
+    cache = frame_masks(df)
+    if name not in cache or cache[name][0] != version:
+        matches = pd.Series(predicate(df), index=df.index)
+        cache[name] = (version, matches.fillna(False).astype(bool))
+    return cache[name][1].copy()
+
+def frame_masks(df):
+    ''' Return the cached masks of df, which are discarded once df is.'''
+    key = id(df)
+    if key not in _masks:
+        _masks[key] = {}
+        weakref.finalize(df, _masks.pop, key, None)
+    return _masks[key]
+
+def frame_version(df, columns):
+    ''' Identity of the index and of the arrays holding the columns of df,
+        which is checked without reading any values.
+    '''
+    return (id(df.index), len(df)) + tuple(array_identity(df[x]) for x in columns)
+
+def array_identity(column):
+    ''' The extension array or the memory of the numpy array holding a
+        column, either changes when the column is replaced.
+    '''
+    if pd.api.types.is_extension_array_dtype(column.dtype):
+        return id(column.array)
+    values = column.values
+    return (values.__array_interface__['data'][0], values.strides)
+
+def invalidate(df):
+    ''' Discard the cached masks of df, e.g. once values have been set in place.'''
+    _masks.pop(id(df), None)
+
+def no_negative_controls(df):
+    ''' Remove the negative control (blank) samples from the dataframe'''
+    return df[~mask(df, 'negative_control')]
 
 def truly_pathogenic(df):
     ''' filter for validated pathogenic and likely pathogenic variants'''
-    return validated_only(pathogenic_only(df))
+    return df[mask(df, 'pathogenic') & mask(df, 'validated')]
+
+def truly_pathogenic_mask(df):
+    ''' Boolean array marking the validated pathogenic and likely pathogenic variants'''
+    return (mask(df, 'pathogenic') & mask(df, 'validated')).values
 
 def pathogenic_only(df):
     ''' Filter for pathogenic and likely pathogenic variants only '''
-    pathogenic_new = df[(df['New Category'] == "Pathogenic") | 
-                        (df['New Category'] == "Likely Pathogenic") | 
-                        (df['New Category'] == "Pathogenic/Likely Pathogenic")]
-    return pathogenic_new
+    return df[mask(df, 'pathogenic')]
 
 def validated_only(df):
     ''' Filter out non validated rows from the df'''
-    valid = df[df.apply(lambda x: x['validation'] == 1, axis=1)]
-    return valid
+    return df[mask(df, 'validated')]
+
+def vus_only(df):
+    ''' Filter for variants of uncertain significance only '''
+    return df[mask(df, 'vus')]
 
 def check_for_unwanted(df):
-    ''' Print the number of samples containing SKI exon 1 and low AB within a given df
+    ''' Print the number of samples containing variants within false positive 
+        regions (e.g. SKI exon 1) and low AB within a given df
     '''
-    num_ski = df[((df['Symbol'] == 'SKI') & (df['Exon'] == '1/7')) |
-                 ((df['Symbol'] == 'SKI') & (df['Exon'] == "01-Jul"))].shape[0]
-    num_ab = df[df['AB'] < 0.3].shape[0]
-    print("{} of SKI exon 1 identified and {} of variants with a low AB".format(num_ski, num_ab))
+    num_regions = mask(df, 'false_positive_region').sum()
+    num_ab = df[df['AB'] < false_positives.AB_THRESHOLD].shape[0]
+    print("{} of false positive regions identified and {} of variants with a low AB".format(
+        num_regions, num_ab))
@@ -1,8 +1,8 @@
 import pandas as pd
 
-def merge_survival_data(df, yale_survival):
-    ''' Merge most_damaging data with Yale survival data'''
-    survival = pd.read_csv(yale_survival, encoding="ISO-8859-1")
+def merge_survival_data(df, survival_file):
+    ''' Merge most_damaging data with a cohorts (e.g. Yale) survival data'''
+    survival = pd.read_csv(survival_file, encoding="ISO-8859-1")
     # only use Sample data presenet within parsed df
     shared_survival = survival[survival['Sample'].isin(df['Sample'].unique())]
     shared_survival = shared_survival[['Sample', 'Long-term mortality (0=no, 1=yes)',
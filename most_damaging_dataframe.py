@@ -3,123 +3,130 @@ import data_cleaning.get_next_most_damaging as nmd
 import data_cleaning.genotype_phenotype as gp
 import data_cleaning.phenotype_correction as pc
 import data_cleaning.filter_by_depth as fd
+import data_cleaning.simple_filters as sf
+import data_cleaning.cohorts as ch
 from data_cleaning import conversion
+from data_cleaning import instrument
 from data_cleaning import survival
 from data_cleaning import rename
 import pandas as pd
 
-def create_most_damaging(uk_all, uk_most_damaging, uk_phenotype,
-                         yale_all, yale_most_damaging, yale_phenotype,
-                         yale_survival, file_path, depth_threshold=80):
+# columns converted to numbers once the cohorts are merged
+NUMERIC_COLUMNS = ['validation', 'AB', 'age_at_surgery', 'age at diagnosis',
+                   'maximal aortic size (cm)', 'aortic size at diagnosis (cm)', 
+                   'No.of Aortic Operations - Endovascular', 
+                   'No.of Aortic Operations - Open', 
+                   'No.of Aortic Operations - Hybrid']
+
+def create_most_damaging(cohorts, all_variants, file_path, depth_threshold=80, 
+                         workers=None):
     ''' Merge the most damaging genotype, phenotype and survival
-        data from both cohorts and clean the merged data.
+        data from every cohort and clean the merged data. Each cohort
+        is merged in a separate process.
 
     Args:
-        uk_all: All UK variants DataFrame
-        yale_all: All Yale variants DataFrame
-        uk_most_damaging: Most Damaging UK CSV file
-        yale_most_damaging: Most Damaging Yale CSV file
-        uk_phenotype: phenotype data for the UK cohort
-        yale_phenotype: phenotype data for the Yale cohort
-        yale_survival: survival data for Yale patients
+        cohorts: list of cohorts.Cohort detailing each cohorts input files
+        all_variants: All variants DataFrame of every cohort
         file_path: path to the TAAD_analysis directory
         depth_threshold: determines read depth threshold for filtering
+        workers: number of processes, defaults to one per cohort (up to 
+                 the number of CPUs)
 
     Returns:
         a cleaned most damaging variants dataframe which includes
         genotype, phenotype and survival data for all patients in
         all cohorts.
     '''
-    # Merge Genotype-Phenotype
-    uk_md, yale_md = most_damaging_dataframes(uk_most_damaging, uk_phenotype,
-                                              yale_most_damaging, yale_phenotype)
-    # Next Most Damaging Variant
-    df = next_most_damaging_combine(uk_md, yale_md, uk_all, yale_all)
-    # Merge Survival Data
-    df = survival.merge_survival_data(df, yale_survival)
+    # Merge Genotype-Phenotype, Next Most Damaging Variant & Survival Data
+    cohort_variants = [all_variants[all_variants['cohort'] == x.cohort] for x in cohorts]
+    df = pd.concat(ch.map_cohorts(cohort_most_damaging, cohorts, cohort_variants,
+                                  workers=workers), sort=False, ignore_index=True)
     survival_columns = ['Sample', 'Long-term mortality (0=no, 1=yes)', 
                         'Type of surgery (0=elective, 1=urgent/emergent)',
                         'Peri-operative morality (0=no, 1=yes)']
-    phenotype_columns = get_phenotype_columns(yale_phenotype)
+    phenotype_columns = get_phenotype_columns(ch.input_files(cohorts, ['phenotype']))
     md_phenotype_columns = phenotype_columns + survival_columns
     # Dtype Conversion
-    numeric = ['validation', 'AB', 'age_at_surgery', 'age at diagnosis',
-               'maximal aortic size (cm)', 'aortic size at diagnosis (cm)', 
-               'No.of Aortic Operations - Endovascular', 
-               'No.of Aortic Operations - Open', 
-               'No.of Aortic Operations - Hybrid']
-    df = conversion.convert2numeric(df, numeric)
+    df = conversion.convert2numeric(df, NUMERIC_COLUMNS)
     # Resolve Phenotype Difference
-    df = pc.phenotype_resolver(df, phenotype_columns)
+    df = instrument.measure('most_damaging.phenotype_resolver', pc.phenotype_resolver, 
+                            df, phenotype_columns, 
+                            diff_outfile=file_path+"output/cleaned_data/"
+                            "Duplicate_Phenotype_Differences.csv")
     # Correct Typos
-    df = rename.rename_entries(df)
+    df = instrument.measure('most_damaging.rename_entries', rename.rename_entries, df)
     # Resolve Data Ambiguity
-    df = nc.create_new_columns(df, three_categories=True)
+    df = instrument.measure('most_damaging.new_columns', nc.create_new_columns, 
+                            df, three_categories=True)
     # Remove Duplicates & Negative Controls
-    df = df.drop_duplicates(['Symbol', 'Exon', 'Category', 'same',
-                             'age at diagnosis', 'primary diagnosis',
-                             'Gender', 'location of primary diagnosis',
-                             'proven family_history', 'maximal aortic size (cm)',
-                             'probable family_history', 'validation'])
-    ### drop the remaining duplicates that have the least pathogenic variant
-    df = df.sort_values('New Category code').groupby('same').last()
-    df = df[~df['Sample'].str.contains("Blank|blank|ddH20|dH2O|H2O|BLANK|ddh2o")]
+    df = instrument.measure('most_damaging.drop_duplicates', drop_duplicate_variants, df)
+    df = instrument.measure('most_damaging.negative_controls', sf.no_negative_controls, df)
     # Filter by Sequencing Depth
     exclude = phenotype_columns + ['Sample', 'Depth', 'cohort', 
                                    'simple location of primary diagnosis', 
                                    'Age Group', 'family_history']
-    df = fd.filter_by_depth(df=df, 
+    df = instrument.measure('most_damaging.filter_by_depth', fd.filter_by_depth, df=df, 
                             depth_path=file_path+"input_files/", 
+                            depth_dirs={x.cohort: x.depth for x in cohorts if x.depth},
                             sample_column='sample_id', 
                             depth_column='%_bases_above_49', 
                             threshold=depth_threshold, 
                             excluded_columns=exclude)
+    df = instrument.measure('most_damaging.categories', recategorise, df)
+    return df
+
+def drop_duplicate_variants(df):
+    ''' Drop the duplicate samples, keeping the most pathogenic variant of
+        each patient.
+    '''
+    df = df.drop_duplicates(['Symbol', 'Exon', 'Category', 'same',
+                             'age at diagnosis', 'primary diagnosis',
+                             'Gender', 'location of primary diagnosis',
+                             'proven family_history', 'maximal aortic size (cm)',
+                             'probable family_history', 'validation'])
+    ### drop the remaining duplicates that have the least pathogenic variant
+    return df.sort_values('New Category code').groupby('same').last()
+
+def recategorise(df):
+    ''' Fill the pathogenicity of patients without a variant and convert
+        the columns to categories.
+    '''
     # Recategorise Pathogenicity
     df['New Category'] = df['New Category'].fillna("Likely Benign / No Variant")
+    df['Category'] = conversion.add_categories(df['Category'], ['No Variant'])
     df['Category'] = df['Category'].fillna('No Variant')
     # Convert to Categories
-    df = conversion.convert_these_category(df, three_categories=True)
-    return df
-
-def most_damaging_dataframes(uk_most_damaging, uk_phenotype, yale_most_damaging, yale_phenotype):
-    ''' Concatenate the Yale and UK Most Damaging variants
-        data with their respective phenotype data.
-    '''
-    Yale_most_damaging = gp.merge_genotype_phenotype(
-        yale_phenotype, yale_most_damaging)
-    UK_most_damaging = gp.merge_genotype_phenotype(
-        uk_phenotype, uk_most_damaging)
-    Yale_most_damaging['cohort'] = "Yale"
-    UK_most_damaging['cohort'] = "UK"
-    return (UK_most_damaging, Yale_most_damaging)
+    return conversion.convert_these_category(df, three_categories=True)
 
-def next_most_damaging_combine(uk_md, yale_md, uk_all, yale_all):
-    ''' Replace known false positive variants in applicable
-        samples in both cohorts and combine them.
+def cohort_most_damaging(cohort, all_variants):
+    ''' Merge a cohorts most damaging genotype and phenotype data, replace
+        known false positive variants with the next most damaging variants 
+        and merge the cohorts survival data (if any).
 
     Args:
-        uk_md: UK most damaging data in a DataFrame format
-        yale_md: Yale most damaging data in a DataFrame format
-        uk_all: UK all variants data in a DataFrame format
-        yale_all: Yale all variants data in a DataFrame format
-    
-    Returns:
-        a combined DataFrame of both cohorts most damaging variants
-        with false positive variants replaced with the next most damaging
-        variants
+        cohort: cohorts.Cohort
+        all_variants: the cohorts all variants data in a DataFrame format
     '''
-    uk_real_md = nmd.create_new_most_damaging(uk_md, uk_all)
-    yale_real_md = nmd.create_new_most_damaging(yale_md, yale_all)
-    combined_md = pd.concat([uk_real_md, yale_real_md])
-    return combined_md
+    name = 'most_damaging.{}'.format(cohort.cohort)
+    df = instrument.measure(name + '.merge', gp.merge_genotype_phenotype, 
+                            cohort.phenotype, cohort.most_damaging)
+    df['cohort'] = cohort.cohort
+    df = instrument.measure(name + '.next_most_damaging', nmd.create_new_most_damaging, 
+                            df, all_variants)
+    if cohort.survival:
+        df = instrument.measure(name + '.survival', survival.merge_survival_data, 
+                                df, cohort.survival)
+    return df
 
-def get_phenotype_columns(p):
-    ''' Open a phenotype file and return the
-        column names as a list.
+def get_phenotype_columns(phenotypes):
+    ''' Return the column names of the cleaned
+        phenotype files as a list.
     Args:
-        p - phenotype file
+        phenotypes - list of phenotype files
     '''
-    p = rename.rename_columns(pd.read_csv(p, encoding='iso-8859-1'))
-    phenotype_columns = list(p.columns.values)
-    phenotype_columns.remove('Sample')
+    phenotype_columns = []
+    for p in phenotypes:
+        p = gp.clean_phenotype_data(p)
+        phenotype_columns += [x for x in p.columns.values 
+                              if x != 'Sample' and x not in phenotype_columns]
     return phenotype_columns
@@ -0,0 +1,278 @@
+''' Stage and Pipeline model the analysis as a graph of named stages. Each
+    stage declares the stages it depends upon along with the files it reads
+    and writes. Intermediate DataFrames are checkpointed to disk so that only
+    the stages which are out of date for the requested targets are re-run.
+    Render stages (those which only write tables and plots) are run last in
+    a process pool, where a failing stage does not stop the others.'''
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from data_cleaning import frame_store
+from data_cleaning import instrument
+import collections
+import traceback
+import time
+import sys
+import os
+
+class Stage(object):
+    ''' A named step of the pipeline.
+
+    Args:
+        name: stage name e.g. tables.risk_ratio
+        func: function called with the results of deps (in order)
+        deps: names of the stages whose results func requires
+        inputs: files (or directories) read by func
+        outputs: files written by func
+        checkpoint: if True the DataFrame returned by func is saved
+        render: if True func only writes outputs and can be run in
+                a separate process, no stage may depend upon it
+    '''
+    def __init__(self, name, func, deps=(), inputs=(), outputs=(), checkpoint=False,
+                 render=False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.checkpoint = checkpoint
+        self.render = render
+
+class Pipeline(object):
+    ''' Run the stages required to bring the given targets up to date.
+
+    Args:
+        stages: list of Stage objects
+        checkpoint_dir: directory to store the checkpointed DataFrames
+    '''
+    def __init__(self, stages, checkpoint_dir):
+        self.stages = collections.OrderedDict((s.name, s) for s in stages)
+        self.checkpoint_dir = checkpoint_dir
+        self.results = {}
+        for stage in stages:
+            unknown = [d for d in stage.deps if d not in self.stages]
+            if unknown:
+                raise ValueError("{} depends upon unknown stages: {}".format(
+                    stage.name, ', '.join(unknown)))
+            renders = [d for d in stage.deps if self.stages[d].render]
+            if renders:
+                raise ValueError("{} depends upon render stages: {}".format(
+                    stage.name, ', '.join(renders)))
+
+    def select(self, targets=None):
+        ''' Return the stage names referred to by the targets. A target is
+            either a stage name or a prefix of stage names e.g. plots.
+            All stages are returned if no targets are given.
+        '''
+        if not targets:
+            return list(self.stages)
+        selected = []
+        for target in targets:
+            if target in self.stages:
+                matches = [target]
+            else:
+                matches = [x for x in self.stages if x.startswith(target + '.')]
+            if not matches:
+                raise ValueError("Unknown target {}, must be one of: {}".format(
+                    target, ', '.join(self.stages)))
+            selected += [x for x in matches if x not in selected]
+        return selected
+
+    def plan(self, targets=None):
+        ''' Return the names of the selected stages and all their dependencies
+            in the order they need to be run.
+        '''
+        order = []
+        def visit(name):
+            if name in order:
+                return
+            for dep in self.stages[name].deps:
+                visit(dep)
+            order.append(name)
+        for name in self.select(targets):
+            visit(name)
+        return order
+
+    def stale_stages(self, targets=None, force=False):
+        ''' Return an OrderedDict of planned stage names and whether
+            each stage is out of date.
+
+        Args:
+            force: treat the selected targets as out of date
+        '''
+        forced = set(self.select(targets)) if force else set()
+        stale = collections.OrderedDict()
+        for name in self.plan(targets):
+            stale[name] = name in forced or self.is_stale(name, stale)
+        return stale
+
+    def is_stale(self, name, stale):
+        ''' A stage is out of date if a dependency is out of date, any of
+            its outputs are missing or any of its inputs are newer than
+            its outputs.
+        '''
+        stage = self.stages[name]
+        if any(stale[dep] for dep in stage.deps):
+            return True
+        outputs = self.output_files(stage)
+        if not outputs or not all(os.path.exists(x) for x in outputs):
+            return True
+        inputs = [x for x in stage.inputs if os.path.exists(x)]
+        for dep in stage.deps:
+            inputs += self.output_files(self.stages[dep])
+        if not inputs:
+            return False
+        newest_input = max(os.path.getmtime(x) for x in inputs)
+        return newest_input > min(os.path.getmtime(x) for x in outputs)
+
+    def output_files(self, stage):
+        ''' All files written by the stage including its checkpoint.'''
+        outputs = list(stage.outputs)
+        if stage.checkpoint:
+            path = self.checkpoint_path(stage.name)
+            outputs.append(frame_store.frame_file(path) or path + '.pkl')
+        return outputs
+
+    def checkpoint_path(self, name):
+        return os.path.join(self.checkpoint_dir, name)
+
+    def result(self, name):
+        ''' Return the result of a stage, loading it from its
+            checkpoint if it has not been run in this process.
+        '''
+        if name not in self.results:
+            self.results[name] = frame_store.read_frame(self.checkpoint_path(name))
+        return self.results[name]
+
+    def run_stage(self, name):
+        ''' Run a single stage and checkpoint its result.'''
+        stage = self.stages[name]
+        args = [self.result(dep) for dep in stage.deps]
+        print("\nINFO: running stage {}".format(name))
+        result = instrument.measure(name, stage.func, *args)
+        if stage.checkpoint:
+            if not os.path.exists(self.checkpoint_dir):
+                os.makedirs(self.checkpoint_dir)
+            # pickle to ensure the DataFrame is restored exactly
+            frame_store.write_frame(result, self.checkpoint_path(name), parquet=False)
+        self.results[name] = result
+        return result
+
+    def run(self, targets=None, force=False, workers=None):
+        ''' Run every out of date stage required by the targets and
+            return the names of the stages run. Render stages are run
+            after all other stages, see render().
+        '''
+        stale = self.stale_stages(targets, force)
+        renders = []
+        for name, is_stale in stale.items():
+            if not is_stale:
+                print("\nINFO: stage {} is up to date".format(name))
+            elif self.stages[name].render:
+                renders.append(name)
+            else:
+                self.run_stage(name)
+        if renders:
+            self.render(renders, workers)
+        return [name for name, is_stale in stale.items() if is_stale]
+
+    def render(self, names, workers=None):
+        ''' Run the render stages in a process pool, each stage is parsed
+            the results of its dependencies. Failures are reported rather
+            than raised so one broken output does not stop the others.
+
+        Args:
+            names: render stage names
+            workers: number of processes, the stages are run in this
+                     process if 1
+
+        Returns:
+            OrderedDict of stage name and a (seconds, error) tuple where
+            error is None if the stage succeeded
+        '''
+        jobs = collections.OrderedDict(
+            (name, (name, self.stages[name].func, self.dependency_sources(name))) 
+            for name in names)
+        report = collections.OrderedDict((name, (None, None)) for name in names)
+        if workers == 1:
+            for name, job in jobs.items():
+                report[name] = render_job(*job)[:2]
+                self.report_render(name, *report[name])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(render_job, *job, settings=instrument.options()): name 
+                           for name, job in jobs.items()}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        seconds, error, records = future.result()
+                        instrument.extend(records)
+                        report[name] = (seconds, error)
+                    except Exception:
+                        # e.g. the worker process was killed
+                        report[name] = (None, traceback.format_exc())
+                    self.report_render(name, *report[name])
+        failed = [name for name, (seconds, error) in report.items() if error]
+        print("\nINFO: rendered {} of {} outputs".format(len(names) - len(failed), len(names)))
+        for name, (seconds, error) in report.items():
+            print('{:<50} {}'.format(name, 'FAILED' if error else '{:.2f}s'.format(seconds)))
+        return report
+
+    def report_render(self, name, seconds, error):
+        if error:
+            print("\nERROR: stage {} failed:\n{}".format(name, error))
+        else:
+            print("\nINFO: rendered stage {} in {:.2f}s".format(name, seconds))
+
+    def dependency_sources(self, name):
+        ''' Return the checkpoint paths of the stages dependencies, or their
+            results if they are not checkpointed, so render jobs load the
+            DataFrames themselves rather than each being sent a copy.
+        '''
+        sources = []
+        for dep in self.stages[name].deps:
+            path = frame_store.frame_file(self.checkpoint_path(dep))
+            if self.stages[dep].checkpoint and path:
+                sources.append(Checkpoint(path))
+            else:
+                sources.append(self.result(dep))
+        return sources
+
+class Checkpoint(str):
+    ''' Path to a checkpointed DataFrame parsed to a render job.'''
+
+# checkpoints loaded within this process, path: (mtime, DataFrame)
+_loaded = {}
+
+def load_source(source):
+    ''' Return a render jobs argument, loading it if it is a Checkpoint.
+        Each checkpoint is loaded once per process.
+    '''
+    if not isinstance(source, Checkpoint):
+        return source
+    mtime = os.path.getmtime(source)
+    if source not in _loaded or _loaded[source][0] != mtime:
+        _loaded[source] = (mtime, frame_store.read_frame(os.path.splitext(source)[0]))
+    return _loaded[source][1]
+
+def render_job(name, func, sources, settings=None):
+    ''' Call func with the loaded sources as the named stage and return the
+        time taken, the formatted traceback if func raised and the records
+        of the stages measured by the job (see instrument.measure()).
+
+    Args:
+        settings: instrument.options() of the parent process, parsed when
+                  the job is run in a worker process
+    '''
+    if settings is not None:
+        instrument.configure(**settings)
+    measured = len(instrument.records())
+    start = time.time()
+    try:
+        instrument.measure(name, func, *[load_source(x) for x in sources])
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        # figures left open by one job must not be drawn upon by the next
+        if 'matplotlib.pyplot' in sys.modules:
+            sys.modules['matplotlib.pyplot'].close('all')
+    return (time.time() - start, error, instrument.records()[measured:])
@@ -7,8 +7,10 @@ import seaborn as sns
 import numpy as np
 import pandas as pd
 import data_cleaning.simple_filters as sf
-from PIL import Image
-from io import BytesIO
+import plots.export as export
+
+# the variant counts barplot is written as a 300 dpi TIFF
+BARPLOT_FORMATS = {'tiff': 300}
 
 
 def all_variants_barplot(df, outfile):
@@ -22,7 +24,7 @@ def all_variants_barplot(df, outfile):
     '''
     clean_all_variants = df
     variant_counts = variant_counts_df(clean_all_variants, 'Symbol', 'All Genes')
-    split_barplot_variants(variant_counts, outfile)
+    split_barplot_variants(variant_counts, outfile, formats=BARPLOT_FORMATS)
 
 
 def variant_counts_df(df, gene_column, column_to_sort_by='All Genes'):
@@ -37,9 +39,9 @@ def variant_counts_df(df, gene_column, column_to_sort_by='All Genes'):
         df containing the number of total variants and pathogenic/likely
         pathogenic variants
     '''
-    counts_new = df[df['AB'] > 0.3][gene_column].value_counts().to_dict()
-    cond = ((df['New Category'] == 'Pathogenic/Likely Pathogenic') & (df['validation'] == 1))
-    path_new = df[cond][gene_column].value_counts().to_dict()
+    counts_new = observed_counts(df[df['AB'] > 0.3][gene_column])
+    cond = sf.mask(df, 'pathogenic') & sf.mask(df, 'validated')
+    path_new = observed_counts(df[cond][gene_column])
     
     compare_table = pd.DataFrame([counts_new, path_new]).transpose().fillna("-")
 
@@ -52,16 +54,23 @@ def variant_counts_df(df, gene_column, column_to_sort_by='All Genes'):
     return compare_table
 
 
-def split_barplot_variants(df, outfile, colour="b", left_extend=0.15):
+def observed_counts(column):
+    ''' Value counts as a dict, excluding categories not present in column'''
+    counts = column.value_counts()
+    return counts[counts > 0].to_dict()
+
+
+def split_barplot_variants(df, outfile, colour="b", left_extend=0.15, formats=None):
     ''' Produces a split barplot showing the percentage of
         pathogenic or likley pathogenic variants amongst 
         all variants disovered per gene within the given
         df
 
     Args:
-        outfile: desired path and name of the outputted PNG file
+        outfile: desired path and name of the outputted figure
         colour: refers to the bar colours, defaulted to blue
         left_extend: amount of etrax space to give the y-labels
+        formats: dict of format and dpi, defaults to export.FORMATS
     '''
 
     all_column = df.columns[0] 
@@ -110,16 +119,6 @@ def split_barplot_variants(df, outfile, colour="b", left_extend=0.15):
     # adjust y-axis if needed
     plt.gcf().subplots_adjust(left=left_extend)
     fig = ax.get_figure()
-    #fig.savefig(outfile+".png")
-     # adjust y-axis if needed
-    
-    # Workaround to save in TIFF format
-    png1 = BytesIO()
-    fig.savefig(png1, format='png', dpi=300)
-    # fig.savefig(outfile+'.png', dpi=300)
-
-    png2 = Image.open(png1)
-    png2.save(outfile+".tiff")
-    png1.close()
+    export.export_figure(fig, outfile, formats)
     
 
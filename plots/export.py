@@ -0,0 +1,103 @@
+''' export_figure() writes a figure in every configured format. Raster
+    formats sharing a dpi are encoded from a single render of the figure's
+    canvas, while vector formats are written by matplotlib directly.'''
+import matplotlib as mpl
+mpl.use('Agg')   # allows one to run matplotlib and seaborn headless
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+import collections
+import os
+from PIL import Image
+
+# the formats (and dpi) every figure is written in, a dpi of None uses the figures dpi.
+# Further formats are opt-in e.g. FORMATS['tiff'] = 300
+FORMATS = collections.OrderedDict([('png', None)])
+
+# formats encoded from the rendered canvas and their PIL format names
+RASTER_FORMATS = {'png': 'PNG', 'tiff': 'TIFF', 'tif': 'TIFF', 'jpg': 'JPEG', 'jpeg': 'JPEG'}
+VECTOR_FORMATS = ['svg', 'pdf', 'eps', 'ps']
+# lossless compression keeps the TIFFs a similar size to the PNGs
+PIL_OPTIONS = {'TIFF': {'compression': 'tiff_lzw'}}
+# savefig() arguments which are applied to the single render
+RENDER_KWARGS = ['bbox_inches', 'pad_inches']
+
+def export_figure(fig, outfile, formats=None, **kwargs):
+    ''' Write the figure to the outfile in each format.
+
+    Args:
+        fig: matplotlib Figure or a seaborn grid
+        outfile: path of the output, any format extension is replaced by
+                 the extension of each format
+        formats: dict of format and dpi, defaults to FORMATS
+        kwargs: further savefig() arguments. bbox_inches='tight' and
+                pad_inches are applied to the single render, any other
+                argument saves raster formats with savefig() instead.
+
+    Returns:
+        list of the files written
+    '''
+    fig = getattr(fig, 'fig', fig)
+    formats = FORMATS if formats is None else formats
+    single_render = (all(x in RENDER_KWARGS for x in kwargs) 
+                     and kwargs.get('bbox_inches') in (None, 'tight'))
+    by_dpi = collections.OrderedDict()
+    for fmt, dpi in formats.items():
+        if fmt not in RASTER_FORMATS and fmt not in VECTOR_FORMATS:
+            raise ValueError("Unsupported figure format {}, must be one of: {}".format(
+                fmt, ', '.join(list(RASTER_FORMATS) + VECTOR_FORMATS)))
+        if fmt in RASTER_FORMATS and single_render:
+            by_dpi.setdefault(dpi or fig.dpi, []).append(fmt)
+        else:
+            fig.savefig(figure_file(outfile, fmt), format=fmt, dpi=dpi or fig.dpi, **kwargs)
+
+    for dpi, fmts in by_dpi.items():
+        image = render(fig, dpi, **kwargs)
+        for fmt in fmts:
+            encode = image.convert('RGB') if RASTER_FORMATS[fmt] == 'JPEG' else image
+            encode.save(figure_file(outfile, fmt), format=RASTER_FORMATS[fmt], dpi=(dpi, dpi),
+                        **PIL_OPTIONS.get(RASTER_FORMATS[fmt], {}))
+    return figure_files(outfile, formats)
+
+def render(fig, dpi, bbox_inches=None, pad_inches=None):
+    ''' Draw the figure at the given dpi and return the canvas as an image.
+        If bbox_inches is 'tight' the image is cropped to the figures
+        artists (plus pad_inches), as savefig() does.
+    '''
+    canvas = fig.canvas if isinstance(fig.canvas, FigureCanvasAgg) else FigureCanvasAgg(fig)
+    original_dpi = fig.dpi
+    try:
+        fig.dpi = dpi
+        canvas.draw()
+        image = Image.fromarray(np.asarray(canvas.buffer_rgba()).copy())
+        if bbox_inches == 'tight':
+            if pad_inches is None:
+                pad_inches = mpl.rcParams['savefig.pad_inches']
+            bbox = fig.get_tightbbox(canvas.get_renderer()).padded(pad_inches)
+            image = crop(image, bbox, dpi, fig.get_facecolor())
+    finally:
+        fig.dpi = original_dpi
+    return image
+
+def crop(image, bbox, dpi, facecolor):
+    ''' Crop the image to a bbox in inches (from the bottom left), areas
+        beyond the image are filled with the facecolor.
+    '''
+    # savefig() truncates the size of the cropped canvas to whole pixels
+    left, bottom = int(round(bbox.x0 * dpi)), int(round(image.height - bbox.y0 * dpi))
+    right, top = left + int(bbox.width * dpi), bottom - int(bbox.height * dpi)
+    colour = tuple(int(round(x * 255)) for x in facecolor)
+    cropped = Image.new('RGBA', (right - left, bottom - top), colour)
+    cropped.alpha_composite(image.crop((left, top, right, bottom)))
+    return cropped
+
+def figure_file(outfile, fmt):
+    ''' Return the outfile with its format extension replaced by fmt'''
+    base, ext = os.path.splitext(outfile)
+    if ext.lstrip('.').lower() not in list(RASTER_FORMATS) + VECTOR_FORMATS:
+        base = outfile
+    return '{}.{}'.format(base, fmt)
+
+def figure_files(outfile, formats=None):
+    ''' Return the files export_figure() writes for the outfile'''
+    formats = FORMATS if formats is None else formats
+    return [figure_file(outfile, fmt) for fmt in formats]
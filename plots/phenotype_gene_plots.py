@@ -4,6 +4,7 @@ mpl.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import data_cleaning.simple_filters as sf
+import plots.export as export
 from data_cleaning.conversion import convert2category
 
 def fh_v_genes_facetgrid(df, outfile=None):
@@ -14,18 +15,21 @@ def fh_v_genes_facetgrid(df, outfile=None):
     df = sf.truly_pathogenic(df)
     df = df[df['family_history'] != "Unknown Family History"]
 
+    # exclude genes that are categories but have no variants
+    symbol_counts = df['Symbol'].value_counts()
+    symbol_order = symbol_counts[symbol_counts > 0].index.values.tolist()
+
     sns.set(font_scale=1.5, style="whitegrid")
     g = sns.FacetGrid(df, row='family_history', hue='Symbol',
                       aspect=1.9, sharey=False, size=6.5, palette='Greys',
-                      row_order=['yes', 'no'])
-    symbol_order = df['Symbol'].value_counts().index.values.tolist()
+                      row_order=['yes', 'no'], hue_order=symbol_order)
     g = g.map(sns.countplot, "Symbol", order=symbol_order)
     g.facet_axis(0,0).set(ylim=(0,16), title='Family History')
     g.facet_axis(1,0).set(ylim=(0,16), title='No Family History')
     g.set_axis_labels("", "Samples")
 
     if outfile:
-        g.savefig(outfile+'.png')
+        export.export_figure(g, outfile)
 
 def age_diagnosis_v_genes(df, outfile=None):
     ''' Stripplot displaying age at diagnosis against 
@@ -46,4 +50,4 @@ def age_diagnosis_v_genes(df, outfile=None):
         plt.text(pos - 0.1, median_val - 1, "—", color="black", fontsize=14)
 
     if outfile:
-        g.savefig(outfile)
+        export.export_figure(g, outfile)
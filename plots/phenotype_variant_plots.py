@@ -7,6 +7,7 @@ import seaborn as sns
 from scipy import stats
 from data_cleaning.conversion import convert2category
 import plots.plot_manipulations as pm
+import plots.export as export
 import data_cleaning.simple_filters as sf
 
 def age_v_family_history(df, column, outfile=None):
@@ -33,7 +34,7 @@ def age_v_family_history(df, column, outfile=None):
     pm.line_between_plots(ax, x1=0, x2=1, height=90, string='p = '+fam_p_val, fontsize=18)
 
     if outfile:
-        ax.figure.savefig(outfile)
+        export.export_figure(ax.figure, outfile)
 
 def variant_class_violin(df, column, title='', outfile=None):
     ''' Produces a violin plot of the age at surgery vs the variant class.'''
@@ -51,9 +52,8 @@ def variant_class_violin(df, column, title='', outfile=None):
            ylim=(0, 105))
 
     # Seperate and clean each variant class Series
-    pathogenic = df[df['New Category'] == "Pathogenic/Likely Pathogenic"]
-    pathogenic = sf.validated_only(pathogenic)[column].dropna()
-    damaging = df[df['New Category'] == "VUS"][column].dropna()
+    pathogenic = df[sf.mask(df, 'pathogenic') & sf.mask(df, 'validated')][column].dropna()
+    damaging = df[sf.mask(df, 'vus')][column].dropna()
     benign = df[df['New Category'] == "Likely Benign / No Variant"][column].dropna()
 
     # Get unpaired ranksum wilcoxon p-values between each new category and place them upon the plot
@@ -73,7 +73,7 @@ def variant_class_violin(df, column, title='', outfile=None):
                         string="p = "+dam_ben_p_val, fontsize=15)
 
     if outfile:
-        ax.figure.savefig(outfile)
+        export.export_figure(ax.figure, outfile)
 
     return ax
 
@@ -82,7 +82,7 @@ def age_group_v_pathogenic_piechart(df, outfile=None):
          and the percentage of each variant class is present in each group.
     '''
     # remove non validated PLP variants and NaN values in Age Group
-    df = df[~((df['validation'] == 0) & (df['New Category'] == 'Pathogenic/Likely Pathogenic'))]
+    df = df[~(sf.mask(df, 'pathogenic') & (df['validation'] == 0))]
     df = df.dropna(subset=['Age Group', 'New Category']) 
     
     # create percentage lists for piechart
@@ -120,7 +120,7 @@ def age_group_v_pathogenic_piechart(df, outfile=None):
     pm.line_between_plots(axs=ax, x1=0, x2=2.5, height=1.5, fontsize=15, extend=0.2,
                           string="p = {:.2g}".format(pvalue))
     if outfile:
-        ax.figure.savefig(outfile)
+        export.export_figure(ax.figure, outfile)
     
     return ax
 
@@ -157,7 +157,7 @@ def fh_vs_genetic_diagnosis(df, outfile=None):
                           fontsize=14)
 
     if outfile:
-        ax.figure.savefig(outfile)
+        export.export_figure(ax.figure, outfile)
 
 def gender_vs_genetic_diagnosis(df, outfile=None):
     ''' Countplot displaying counts for each variant classification
@@ -192,7 +192,6 @@ def gender_vs_genetic_diagnosis(df, outfile=None):
         ax.text(p.get_x()+0.15, h+3, str(round((h/total), 3)*100)[:4]+"%", ha='center')
 
     if outfile:
-        fig = ax.get_figure()
-        fig.savefig(outfile, bbox_inches='tight')
+        export.export_figure(ax.get_figure(), outfile, bbox_inches='tight')
 
     return ax
@@ -1,7 +1,10 @@
-''' Output a list of individuals with three or more risk factors. '''
+''' Output a list of individuals with three or more risk factors, or the
+    number of individuals (and validated PLP carriers) at every risk score
+    threshold. '''
 
 import data_cleaning.simple_filters as sf
 import pandas as pd
+import numpy as np
 import operator
 
 OPS = {
@@ -16,31 +19,83 @@ OPS = {
     "|": operator.or_,
     "notna": pd.notna,
 }
-def at_risk_indvidiuals(df, outfile=None):
+
+# (phenotype, str operator, value (None for unary operators), weight)
+RISK_FACTORS = [
+    ('Age Group', '=', 'Under 50', 1),
+    ('family_history', '=', 'yes', 1),
+    ('location of primary diagnosis', '=', 'Ascending', 1),
+    ('Known Syndrome', 'notna', None, 1),
+]
+
+def at_risk_indvidiuals(df, outfile=None, risk_factors=RISK_FACTORS, threshold=3):
     ''' 
         Output CSV of patients with three or more risk factors 
         suggesting a genetic cause.
+
+    Args:
+        df: DataFrame
+        risk_factors: list of (phenotype, operator, value, weight) tuples
+        threshold: minimum risk score of the patients output
     '''
-    risk_groups = (
-                    ('Age Group', '=', 'Under 50'),
-                    ('family_history', '=', 'yes'),
-                    ('location of primary diagnosis', '=', 'Ascending'),
-                    ('Known Syndrome', 'notna', None)
-    )
-    scores = [0] * len(df) 
-    for i in range(len(df)): #can we do this without looping over dataframe?
-        for rg in risk_groups:
-            pheno, op, val = rg
-            if val is not None:
-                if OPS[op](df[pheno][i], val):
-                    scores[i] += 1
-            else:
-                if OPS[op](df[pheno][i]):
-                    scores[i] += 1
-    df['risk_score'] = scores
+    df = df.assign(risk_score=risk_scores(df, risk_factors))
     cols_to_keep = ['New Category', 'Category', 'Age Group', 'family_history', 
                     'location of primary diagnosis', 'Known Syndrome', 
                     'risk_score']
-    at_risk = df[df['risk_score'] >= 3][cols_to_keep]
+    at_risk = df[df['risk_score'] >= threshold][cols_to_keep]
     if outfile:
         at_risk.to_csv(outfile)
+    return at_risk
+
+def risk_score_distribution(df, outfile=None, risk_factors=RISK_FACTORS):
+    ''' Table of the patients who would be selected at each risk score
+        threshold, along with how many carry a validated pathogenic or
+        likely pathogenic variant, so a threshold can be chosen for
+        prioritising genetic testing.
+
+    Returns:
+        DataFrame indexed by every attainable threshold (from highest to
+        lowest) of the number and percentage of patients at or above the
+        threshold and the number and percentage of these with a validated
+        PLP variant
+    '''
+    scores = risk_scores(df, risk_factors)
+    plp = sf.truly_pathogenic_mask(df)
+    thresholds, inverse = np.unique(scores, return_inverse=True)
+    # patients and PLP carriers per score, accumulated from the highest score
+    patients = np.bincount(inverse, minlength=len(thresholds))[::-1].cumsum()
+    carriers = np.bincount(inverse, weights=plp, minlength=len(thresholds))[::-1].cumsum()
+    carriers = carriers.astype(int)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = pd.DataFrame({
+            'Patients': patients,
+            'Patients (%)': np.round(patients / len(df) * 100, 1),
+            'PLP': carriers,
+            'PLP (%)': np.round(carriers / patients * 100, 1),
+        }, index=pd.Index(thresholds[::-1], name='Risk Score Threshold'))
+    if outfile:
+        table.to_csv(outfile)
+    return table
+
+def risk_scores(df, risk_factors=RISK_FACTORS):
+    ''' Return the sum of the weights of the risk factors each patient
+        has, missing values are not a risk factor.
+    '''
+    factors = risk_factor_matrix(df, risk_factors)
+    weights = np.array([x[3] for x in risk_factors])
+    return factors.dot(weights) if len(weights) else np.zeros(len(df), dtype=int)
+
+def risk_factor_matrix(df, risk_factors=RISK_FACTORS):
+    ''' Evaluate every risk factor as a whole column into a boolean matrix
+        with a row per patient and a column per risk factor.
+    '''
+    columns = []
+    for pheno, op, val, weight in risk_factors:
+        if val is not None:
+            result = OPS[op](df[pheno], val)
+        else:
+            result = OPS[op](df[pheno])
+        columns.append(np.asarray(pd.Series(result).fillna(False), dtype=bool))
+    if not columns:
+        return np.empty((len(df), 0), dtype=bool)
+    return np.column_stack(columns)
@@ -1,4 +1,4 @@
-''' demogrphics_table() and its helper function retrieve all demographics data for each cohort and outputs as a csv table'''
+''' demogrphics_table() and its helper functions retrieve all demographics data for each cohort (or any other stratification of the patients) and outputs as a csv table'''
 import numpy as np
 import pandas as pd
 import collections
@@ -19,133 +19,158 @@ OPS = {
     "|": operator.or_ 
 }
 
-def demographics_table(df, outfile=None):
-    ''' Get all demographic data for each cohort as a
-        Series and combine them into a DataFrame.
+def operated(df):
+    ''' Patients that have had some form of aortic operation.'''
+    operations = df[['No.of Aortic Operations - Endovascular',
+                     'No.of Aortic Operations - Open',
+                     'No.of Aortic Operations - Hybrid']]
+    return (operations > 0).any(axis=1)
+
+def other_syndrome(df):
+    ''' Patients/samples without MFS, EDS or LDS.'''
+    normal = df['Known Syndrome'].fillna('-')
+    return ~normal.str.contains('Marfan|LDS|EDS|-')
+
+# (row label, statistic, source) of each row of the table in order where
+# statistic is one of:
+#   None: section heading
+#   'numbers': number and percentage of all patients passing the depth threshold
+#   'median', 'min' or 'max': of the source column
+#   'count': number and percentage of patients matching the source, either
+#            (column, value, operator) or a function returning a boolean Series.
+#            A '|' within value matches any of the alternatives at the start
+#            of the column e.g. ('Known Syndrome', 'Marfan|LDS|EDS')
+DEMOGRAPHICS = [
+    ('Demographics', None, None),
+    ('Numbers (%)', 'numbers', None),
+    ('Age at Diagnosis, Median', 'median', 'age at diagnosis'),
+    ('Age at Diagnosis, Min', 'min', 'age at diagnosis'),
+    ('Age at Diagnosis, Max', 'max', 'age at diagnosis'),
+    ('Male (%)', 'count', ('Gender', 'Male')),
+    ('Female (%)', 'count', ('Gender', 'Female')),
+    # ETHNICITY
+    ('Probable/Proven Family History(%)', 'count', ('family_history', 'yes')),
+    ('No Family History (%)', 'count', ('family_history', 'no')),
+    ('Undergone Aortic Surgery', 'count', operated),
+    ('Primary Aortic Pathology', None, None),
+    ('Aneurysm (%)', 'count', ('primary diagnosis', 'Aneurysm')),
+    ('Dissection (%)', 'count', ('primary diagnosis', 'Dissection')),
+    ('IMH/PAU (%)', 'count', ('primary diagnosis', 'IMH|PAU')),
+    ('Rupture (%)', 'count', ('Rupture (Y/N)', 'Y')),
+    ('Primary Anatomical Presentation', None, None),
+    ('Ascending/Arch (%)', 'count', ('location of primary diagnosis',
+                                     ".*Ascending.*|.*Arch.*")),
+    ('Descending/Thoracoabdominal (%)', 'count', ('location of primary diagnosis',
+                                                  'Descending|Thoracoabdominal'
+                                                  '|Infrarenal')),
+    ('Aortic Size', None, None),
+    ('Maximum Aortic Diameter (cm), Median', 'median', 'maximal aortic size (cm)'),
+    ('Maximum Aortic Diameter (cm), Min', 'min', 'maximal aortic size (cm)'),
+    ('Maximum Aortic Diameter (cm), Max', 'max', 'maximal aortic size (cm)'),
+    ('Maximum Aortic Diameter < 5.5cm (%)', 'count', ('maximal aortic size (cm)', 5.5, '<')),
+    ('Known Syndrome', None, None),
+    ('MFS (%)', 'count', ('Known Syndrome', 'Marfan')),
+    ('LDS (%)', 'count', ('Known Syndrome', 'LDS')),
+    ('EDS (%)', 'count', ('Known Syndrome', 'EDS')),
+    ('Other (%)', 'count', other_syndrome),
+]
+# rows formatted other than as their value
+ROW_FORMATS = {'Maximum Aortic Diameter (cm), Min': '{0:1f}'}
+# column of aggregate_statistics() holding the number of patients per group
+PATIENTS = 'patients'
+
+def demographics_table(df, outfile=None, strata=('cohort',), rows=DEMOGRAPHICS):
+    ''' Get all demographic data of the patients passing the sequencing
+        depth threshold for each stratum and the whole cohort. Every
+        stratum is aggregated in a single grouped pass.
     Args:
         df: cleaned most damaging dataframe
+        strata: columns to stratify the patients by e.g. 
+                ['cohort', 'Gender'] or ['cohort', 'Age Group']
+        rows: list of (row label, statistic, source) tuples, see DEMOGRAPHICS
+
+    Returns:
+        DataFrame with a row per demographic and a column per stratum
+        e.g. 'UK Cohort' or 'UK, Male Cohort' followed by 'Whole Cohort'
     '''
-    series_storage = []
-    for cohort_name in ['Yale', 'UK', None]:
-        cohort_passed, df_passed = passed_depth_threshold(df, cohort_name)
-        cohort_dict = get_demographics_dict(cohort_passed, df_passed)
-        cohort_series = pd.Series(cohort_dict)
-        series_storage.append(cohort_series)
-    demographics = pd.concat(series_storage, axis=1)
-    demographics.columns = ['Yale Cohort', 'UK Cohort', 'Whole Cohort']
+    passed = df[df['Depth'] != 'LOW']
+    statistics = pd.concat([aggregate_statistics(passed, rows, list(strata)),
+                            aggregate_statistics(passed, rows)])
+    demographics = format_demographics(statistics, rows, len(passed))
     if outfile:
         demographics.to_csv(outfile)
     return  demographics
 
-def passed_depth_threshold(df, cohort_name=None):
-    ''' Returns most damagining dataframe that passed the
-        sequencing depth threshold for the whole cohort
-        and for a given sub-cohort (UK or Yale)
-    '''
-    passed = df[df['Depth'] != 'LOW']
-    if cohort_name:
-        cohort = passed[passed['cohort'] == cohort_name]
-    else:
-        cohort = passed
-    return (cohort, passed)
+def aggregate_statistics(df, rows, keys=None):
+    ''' Aggregate the statistics of every row for each group of patients
+        sharing the values of the key columns in one grouped pass. All
+        patients form a single 'Whole Cohort' group if there are no keys.
 
-def get_demographics_dict(cohort, passed):
-    ''' Get all demographic data for the given cohort DataFrame
-        and store inside a dict.
-    Args:
-        cohort: most damaging dataframe 
+    Returns:
+        DataFrame indexed by the group names with a column of the number
+        of patients and a column per (non heading) row
     '''
-    d = collections.OrderedDict()
-    d['Demographics'] = ''
-    d['Numbers (%)'] = get_patient_numbers(cohort, passed)
-    d['Age at Diagnosis, Median'] = cohort['age at diagnosis'].median()
-    d['Age at Diagnosis, Min'] = cohort['age at diagnosis'].min()
-    d['Age at Diagnosis, Max'] = cohort['age at diagnosis'].max()
-    d['Male (%)'] = get_numbers(cohort, 'Gender', 'Male')
-    d['Female (%)'] = get_numbers(cohort, 'Gender', 'Female')
-    # ETHNICITY
-    d['Probable/Proven Family History(%)'] = get_numbers(cohort, 'family_history', 'yes')
-    d['No Family History (%)'] = get_numbers(cohort, 'family_history', 'no')
-    d['Undergone Aortic Surgery'] = percent_operated(cohort)
-    d['Primary Aortic Pathology'] = ''
-    d['Aneurysm (%)'] = get_numbers(cohort, 'primary diagnosis', 'Aneurysm')
-    d['Dissection (%)'] = get_numbers(cohort, 'primary diagnosis', 'Dissection')
-    d['IMH/PAU (%)'] = get_numbers(cohort, 'primary diagnosis', 'IMH|PAU')
-    d['Rupture (%)'] = get_numbers(cohort, 'Rupture (Y/N)', 'Y')
-    d['Primary Anatomical Presentation'] = ''
-    d['Ascending/Arch (%)'] = get_numbers(cohort, 
-                                          'location of primary diagnosis',
-                                          ".*Ascending.*|.*Arch.*")
-    d['Descending/Thoracoabdominal (%)'] = get_numbers(cohort,
-                                                       'location of primary diagnosis',
-                                                       'Descending|Thoracoabdominal'
-                                                       '|Infrarenal')
-    d['Aortic Size'] = ''
-    d['Maximum Aortic Diameter (cm), Median'] = cohort['maximal aortic size (cm)'].median()
-    d['Maximum Aortic Diameter (cm), Min'] = '{0:1f}'.format(cohort['maximal aortic size (cm)'].min())
-    d['Maximum Aortic Diameter (cm), Max'] = cohort['maximal aortic size (cm)'].max()
-    d['Maximum Aortic Diameter < 5.5cm (%)'] = get_numbers(cohort,
-                                                           'maximal aortic size (cm)',
-                                                           5.5, op="<")
-    d['Known Syndrome'] = ''
-    d['MFS (%)'] = get_numbers(cohort, 'Known Syndrome', 'Marfan')
-    d['LDS (%)'] = get_numbers(cohort, 'Known Syndrome', 'LDS')
-    d['EDS (%)'] = get_numbers(cohort, 'Known Syndrome', 'EDS')
-    d['Other (%)'] = get_other_syndromic_numbers(cohort)
-    return d
+    columns = collections.OrderedDict([(PATIENTS, np.ones(len(df), dtype=int))])
+    how = collections.OrderedDict([(PATIENTS, 'sum')])
+    for label, statistic, source in rows:
+        if statistic == 'count':
+            columns[label] = indicator(df, source)
+            how[label] = 'sum'
+        elif statistic in ('median', 'min', 'max'):
+            columns[label] = df[source].values
+            how[label] = statistic
+    frame = pd.DataFrame(columns, index=df.index)
+    groups = [df[x] for x in keys] if keys else np.zeros(len(df), dtype=int)
+    statistics = frame.groupby(groups, observed=True).agg(how)
+    statistics.index = [group_name(x, keys) for x in statistics.index]
+    return statistics
 
-def get_patient_numbers(cohort, passed):
-    '''Get the number and percentage of patients which 
-       passed the depth thershold from all cohorts
+def indicator(df, source):
+    ''' Boolean array marking the patients matching a count rows source,
+        missing values do not match.
     '''
-    return '{0:d}({1:.1f})'.format(len(cohort), len(cohort)/len(passed)*100)
-
-def get_numbers(df, col, val, op='='):
-    ''' Get the number and percentage of patints with/without
-        a given phenotype feature
-
-    Args: 
-        df: dataframe of a given cohort
-        col: column to query
-        val: value to filter for in column
-        op: operator symbol
-
-    Return:
-        str containing number of vals in col and 
-        percentage of vals against total patient number
+    if callable(source):
+        result = source(df)
+    else:
+        col, val = source[:2]
+        calc = OPS[source[2] if len(source) > 2 else '=']
+        if isinstance(val, str) and '|' in val:
+            if calc != operator.eq:
+                raise TypeError('Operators other than eq will not'
+                                'work when "|" is present in val')
+            result = df[col].str.match(val)
+        else:
+            result = calc(df[col], val)
+    return np.asarray(pd.Series(result).fillna(False), dtype=bool)
 
-    Notes:
-        The below example searches for samples/patients who have 
-        either Marfan, LDS or EDS in their Known Syndrome column
-        and returns the corresponding number and percentage.
-        
-            get_numbers(df, 'Known Syndrome', 'Marfan|LDS|EDS')
-    '''
-    calc = OPS[op]
-    if isinstance(val, float) or (isinstance(val, str) and '|' not in val):
-        df_num = len(df[calc(df[col], val)])
-    elif '|' in val:
-        if calc != operator.eq:
-            raise TypeError('Operators other than eq will not'
-                            'work when "|" is present in val')
-        df_num = np.sum(df[col].str.match(val))
-    return '{0:d} ({1:.1f})'.format(df_num, df_num/len(df)*100)
+def group_name(group, keys):
+    ''' Column name of a group e.g. 'UK Cohort' or 'UK, Male Cohort' '''
+    if not keys:
+        return 'Whole Cohort'
+    group = group if isinstance(group, tuple) else (group,)
+    return '{} Cohort'.format(', '.join(str(x) for x in group))
 
-def percent_operated(df):
-    ''' Get the number and percentage of patients that have had some 
-        form of aortic operation.
-    '''
-    operated = df[['No.of Aortic Operations - Endovascular',
-                   'No.of Aortic Operations - Open',
-                   'No.of Aortic Operations - Hybrid']]
-    operated_patients = len(df[(operated > 0).any(axis=1)])
-    return '{0:d} ({1:.1f})'.format(operated_patients, operated_patients/len(df)*100)
+def format_demographics(statistics, rows, total):
+    ''' Format the aggregated statistics as a table with a row per
+        demographic and a column per group.
 
-def get_other_syndromic_numbers(df):
-    ''' Get number and percentage of patients/samples
-        without MFS, EDS or LDS.
+    Args:
+        statistics: DataFrame returned by aggregate_statistics()
+        total: number of patients which passed the depth threshold
     '''
-    normal = df['Known Syndrome'].fillna('-')
-    other = df[~normal.str.contains('Marfan|LDS|EDS|-')]
-    return '{0:d} ({1:.1f})'.format(len(other), len(other)/len(df)*100)
-
+    patients = statistics[PATIENTS].values
+    table = []
+    for label, statistic, source in rows:
+        if statistic is None:
+            values = [''] * len(statistics)
+        elif statistic == 'numbers':
+            values = ['{0:d}({1:.1f})'.format(n, n/total*100) for n in patients]
+        elif statistic == 'count':
+            values = ['{0:d} ({1:.1f})'.format(x, x/n*100)
+                      for x, n in zip(statistics[label].values, patients)]
+        elif label in ROW_FORMATS:
+            values = [ROW_FORMATS[label].format(x) for x in statistics[label]]
+        else:
+            values = list(statistics[label])
+        table.append(values)
+    return pd.DataFrame(table, index=[x[0] for x in rows], columns=statistics.index)
@@ -4,7 +4,6 @@ from scipy import stats
 import pandas as pd
 import numpy as np
 import operator
-import math
 
 OPS = {
     ">": operator.gt,
@@ -19,39 +18,83 @@ OPS = {
     "notna": pd.notna,
 }
 
-def risk_ratio_table(df, outfile=None):
+# (phenotype, str operator, exposed phenotype group, non-exposed phenotype group)
+# should include LDS with Marfan
+TEST_GROUPS = [
+    ('Age Group', '=', 'Under 50', 'Over 50'), 
+    ('family_history', '=', 'yes', 'no'),
+    ('Gender', '=', 'Male', 'Female'),
+    ('location of primary diagnosis', '=', 'Ascending', None),
+    ('primary diagnosis', '=', 'Dissection', None),
+    ('maximal aortic size (cm)', '<=', 5, None),
+    ('Long-term mortality (0=no, 1=yes)', '=', 0, 1),
+    ('Known Syndrome', 'notna', None, None)
+]
+
+# largest number of patient draws held in memory per bootstrap batch (~24 bytes each)
+BATCH_CELLS = 2**22
+
+def risk_ratio_table(df, outfile=None, test_groups=TEST_GROUPS, ci='wald', 
+                     replicates=10000, seed=None):
     ''' Construct a risk ratio table for phenotypes
         associated with increased mortality in TAAD
         patients.
+
+    Args:
+        ci: 'wald' for the log risk ratio interval or 'bootstrap' for a 
+            percentile bootstrap interval, which remains defined for small
+            groups and tables with an empty cell
+        replicates: number of bootstrap replicates
+        seed: seed of the bootstrap resampling
     '''
-    # should include LDS with Marfan
-    test_groups = [
-        ('Age Group', '=', 'Under 50', 'Over 50'), 
-        ('family_history', '=', 'yes', 'no'),
-        ('Gender', '=', 'Male', 'Female'),
-        ('location of primary diagnosis', '=', 'Ascending', None),
-        ('primary diagnosis', '=', 'Dissection', None),
-        ('maximal aortic size (cm)', '<=', 5, None),
-        ('Long-term mortality (0=no, 1=yes)', '=', 0, 1),
-        ('Known Syndrome', 'notna', None, None)
-    ]
-
-    all_table_rows = get_table_rows(df, test_groups)
-    rr_table = pd.DataFrame(all_table_rows)
-    rr_table.columns = ['','Total', 
+    exposures = exposure_matrix(df, test_groups)
+    disease = sf.truly_pathogenic_mask(df)
+    counts = contingency_counts(exposures, disease, [x[0] for x in test_groups])
+    if ci == 'bootstrap':
+        intervals = bootstrap_intervals(exposures, disease, replicates, seed=seed)
+    elif ci == 'wald':
+        intervals = None
+    else:
+        raise ValueError("ci must be wald or bootstrap not {}".format(ci))
+    rr_table = get_table_rows(counts, intervals)
+    rr_table.columns = ['Total', 
                         'Number/Percentage with a Pathogenic or Likely '
                         'Pathogenic Variant Validated by Sanger', 
                         'RR(95% CI)', 'P-Value']
-    rr_table = rr_table.set_index('')
+    rr_table.index.name = ''
     rr_table = rename_index(rr_table)
     if outfile:
         rr_table.to_csv(outfile)
     return rr_table
 
-def get_table_rows(df, test_groups):
+def get_table_rows(counts, intervals=None):
     ''' Get the total patient number, pathogenic variant number/percentage,
-        risk ratio and p-value for each phenotype feature and conditions
-        given and return as a nested list. 
+        risk ratio and p-value for each test group from its contingency
+        counts.
+
+    Args:
+        counts: DataFrame returned by contingency_counts()
+        intervals: (lower, upper) confidence interval arrays to use 
+                   instead of the Wald interval
+    '''
+    a, b, c, d = [counts[x].values for x in 'abcd']
+    total = a + b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent_plp = a / total * 100
+    RR, CI_low, CI_up = risk_ratios(a, b, c, d)
+    if intervals is not None:
+        CI_low, CI_up = intervals
+    return pd.DataFrame({
+        'Total': total,
+        'PLP': ['{0:d} ({1:.1f})'.format(n, p) for n, p in zip(a, percent_plp)],
+        'RR': ["{:.2f} ({:.2f}-{:.2f})".format(*x) for x in zip(RR, CI_low, CI_up)],
+        'P-Value': fisher_pvalues(a, b, c, d)
+    }, index=counts.index)
+
+def exposure_matrix(df, test_groups):
+    ''' Evaluate the exposure of every test group into one boolean matrix
+        with a row per patient and, for each test group, an exposed column
+        followed by a non-exposed column.
 
     Args:
         df: DataFrame
@@ -59,91 +102,137 @@ def get_table_rows(df, test_groups):
             (phenotype, str operator, exposed phenotype group, 
              non-exposed phenotype group)
     '''
-    table_rows = []
-    for group in test_groups:
-        phenotype, operation, exposed, not_exposed = group
-        op = OPS[operation]
-        rr, pval = pathogenic_risk_ratio(df, phenotype, op, exposed, not_exposed)
-        plp_num = pathogenic_number(df, phenotype, op, exposed)
-        if exposed is None:
-            total = len(df[op(df[phenotype])])
-        else:
-            total = len(df[op(df[phenotype], exposed)])
-        table_rows.append([phenotype, total, plp_num, rr, pval])
-    return table_rows
-
-def pathogenic_number(df, col, op, value):
-    ''' Returns the number and percentage of pathogenic 
-        variants that meet the given phenotype conditions.
+    columns = [x for group in test_groups for x in exposure(df, *group)]
+    if not columns:
+        return np.empty((len(df), 0), dtype=bool)
+    return np.column_stack(columns)
+
+def contingency_counts(exposures, disease, names):
+    ''' Count the patients within each cell of every test groups
+        contingency table:
+
+                         Disease     No Disease
+      Exposed Group         a             b
+      Not Exposed Group     c             d
+
+        where disease is carrying a validated pathogenic or likely 
+        pathogenic variant. All groups are counted with a single matrix 
+        product.
+
     Args:
-        df: DataFrame
-        col: phenotype column
-        op: operator string
-        value: value col will be filtered for
+        exposures: boolean matrix returned by exposure_matrix()
+        disease: boolean array marking the patients with the disease
+        names: name of each test group
+
+    Returns:
+        DataFrame of a, b, c and d indexed by name with a row per test group
     '''
-    if value is None:
-        group = df[op(df[col])]
-    else:
-        group = df[op(df[col], value)]
-    plp_group = sf.validated_only(sf.pathogenic_only(group))
-    percent_plp = len(plp_group) / len(group) * 100
-    return '{0:d} ({1:.1f})'.format(len(plp_group), percent_plp)
-
-def pathogenic_risk_ratio(df, col, op, exposed_val=None, not_exposed_val=None):
-    ''' Determine whether a phenotypic trait increases the 
-        liklihood of carrying a causitive mutation for the
-        disorder by performing riask ratio assessment
-        and fishers-exact test.
+    group_total = exposures.sum(axis=0)
+    disease_total = disease.astype(np.int64) @ exposures
+    a, c = disease_total[0::2], disease_total[1::2]
+    return pd.DataFrame({'a': a, 'b': group_total[0::2] - a,
+                         'c': c, 'd': group_total[1::2] - c}, index=names)
+
+def bootstrap_intervals(exposures, disease, replicates=10000, confidence=0.95, 
+                        seed=None, batch_size=500):
+    ''' Percentile bootstrap confidence intervals of the risk ratio of
+        every test group. Each replicate resamples the patients (with 
+        replacement) as an array of indices, which is converted into the 
+        number of times each patient was drawn. A batch of replicates is 
+        then counted for every test group with one matrix product, so all
+        test groups share the same resamples.
+
+    Args:
+        exposures: boolean matrix returned by exposure_matrix()
+        disease: boolean array marking the patients with the disease
+        replicates: number of bootstrap replicates
+        confidence: width of the confidence interval
+        seed: seed of the resampling
+        batch_size: maximum number of replicates drawn at once, reduced
+                    so a batch holds at most BATCH_CELLS draws
+
+    Returns:
+        tuple of lower and upper confidence interval arrays
+    '''
+    n, columns = exposures.shape
+    # diseased and total patients of each exposed/non-exposed column
+    indicators = np.hstack([exposures & disease[:, None], exposures]).astype(np.float64)
+    rng = np.random.RandomState(seed)
+    ratios = np.empty((replicates, columns // 2))
+    batch_size = max(1, min(batch_size, BATCH_CELLS // n))
+    for start in range(0, replicates, batch_size):
+        size = min(batch_size, replicates - start)
+        samples = rng.randint(0, n, size=(size, n))
+        samples += (np.arange(size) * n)[:, None]
+        weights = np.bincount(samples.ravel(), minlength=size*n).reshape(size, n)
+        counts = weights.astype(np.float64) @ indicators
+        with np.errstate(divide='ignore', invalid='ignore'):
+            risk = counts[:, :columns] / counts[:, columns:]
+            ratios[start:start+size] = risk[:, 0::2] / risk[:, 1::2]
+    return percentile_interval(ratios, confidence)
+
+def percentile_interval(replicates, confidence=0.95):
+    ''' Return the lower and upper percentiles of each column of replicates,
+        rounding the ranks outwards. Undefined (nan) replicates are ignored 
+        and infinite replicates (no disease in the non-exposed group) are 
+        kept so the upper limit may be inf.
+    '''
+    ordered = np.sort(replicates, axis=0)   # nan are sorted last
+    valid = (~np.isnan(replicates)).sum(axis=0)
+    tail = (1 - confidence) / 2
+    low_rank = np.floor(tail * (valid - 1)).astype(int).clip(0)
+    up_rank = np.ceil((1 - tail) * (valid - 1)).astype(int).clip(0)
+    columns = np.arange(replicates.shape[1])
+    CI_low = np.where(valid > 0, ordered[low_rank, columns], np.nan)
+    CI_up = np.where(valid > 0, ordered[up_rank, columns], np.nan)
+    return (CI_low, CI_up)
+
+def exposure(df, phenotype, operation, exposed=None, not_exposed=None):
+    ''' Return boolean arrays marking the exposed and non-exposed
+        patients of a test group.
     Args:
         df: DataFrame
-        col: phenotype column
-        op: operator function
-        exposed_val: value of exposed group in column (optional - will 
-                     test for True/False if None)
-        not_exposed_val: value of non-exposed group (optional)
+        phenotype: phenotype column
+        operation: operator string
+        exposed: value of exposed group in column (optional - will 
+                 test for True/False if None)
+        not_exposed: value of non-exposed group (optional - all patients
+                     not exposed if None)
     Notes:
-        The below example input will return the risk ratio
-        of whether having a family history increase the likelihood
-        of carrying a causitive TAAD mutation compared to this
-        without a family history of the disorder.
-          get_risk_ratio(df, 'family_history', '=', 'yes, 'no')
-    Returns:
-        Risk ratio and p-value in a tuple
-    '''    
-    # exposed and non-exposed groups
-    if exposed_val is None:
-        exposed = df[op(df[col])]
-        not_exposed = df[~op(df[col])]
-    else:
-        exposed = df[op(df[col], exposed_val)]
-        if not_exposed_val:
-            not_exposed = df[op(df[col], not_exposed_val)]
-        else:
-            not_exposed = df[~op(df[col], exposed_val)]
-        
-    # Disease exposed and non-exposed groups
-    d_exposed = len(sf.validated_only(sf.pathogenic_only(exposed)))
-    d_not_exposed = len(sf.validated_only(sf.pathogenic_only(not_exposed)))
-    
-    # Non-Disease exposed and non-exposed groups
-    nd_exposed = len(exposed) - d_exposed
-    nd_not_exposed = len(not_exposed) - d_not_exposed
-    
-    rr = risk_ratio(a=d_exposed,
-                    b=nd_exposed,
-                    c=d_not_exposed,
-                    d=nd_not_exposed)
-    pval = stats.fisher_exact([[d_exposed, nd_exposed],
-                              [d_not_exposed, nd_not_exposed]])[1]
-    return (rr, pval)
+        The below example input will return whether each patient has, 
+        or does not have, a family history.
+          exposure(df, 'family_history', '=', 'yes, 'no')
+    '''
+    op = OPS[operation]
+    column = df[phenotype]
+    if exposed is None:
+        is_exposed = as_mask(op(column))
+        return (is_exposed, ~is_exposed)
+    is_exposed = as_mask(op(column, exposed))
+    if not_exposed is None:
+        return (is_exposed, ~is_exposed)
+    return (is_exposed, as_mask(op(column, not_exposed)))
+
+def as_mask(result):
+    ''' Convert the result of an operator to a boolean array where
+        missing values are False.
+    '''
+    return np.asarray(pd.Series(result).fillna(False), dtype=bool)
+
+def fisher_pvalues(a, b, c, d):
+    ''' Fishers exact test p-value for each contingency table. Each 
+        distinct table is only tested once.
+    '''
+    pvalues = {}
+    for table in zip(a, b, c, d):
+        if table not in pvalues:
+            a_, b_, c_, d_ = [int(x) for x in table]
+            pvalues[table] = stats.fisher_exact([[a_, b_], [c_, d_]])[1]
+    return [pvalues[table] for table in zip(a, b, c, d)]
 
 def risk_ratio(a, b, c, d):
     ''' Calculate the risk ratio and confidence intervals.
 
-      Algorithm extracted from the following sources:
-          http://tinyurl.com/jsjvyra
-          http://tinyurl.com/hr3lapx
-
     Args:
                          Disease     No Disease
       Exposed Group         a             b
@@ -167,20 +256,37 @@ def risk_ratio(a, b, c, d):
       have the disease and 25 patients in the non-exposed group
       have the disease. Thus: a=20, b=80, c=25, d=175.
     '''
-    # calculate the risk ratio
-    RR = (a/(a+b)) / (c/(c+d))
+    RR, CI_low, CI_up = risk_ratios(*[np.array([x]) for x in (a, b, c, d)])
+    return "{:.2f} ({:.2f}-{:.2f})".format(RR[0], CI_low[0], CI_up[0])
+
+def risk_ratios(a, b, c, d):
+    ''' Calculate the risk ratio and 95% confidence intervals for arrays
+        of contingency counts (see risk_ratio()). Tables with an empty
+        cell give nan or inf rather than raising.
+
+      Algorithm extracted from the following sources:
+          http://tinyurl.com/jsjvyra
+          http://tinyurl.com/hr3lapx
+
+    Returns:
+      tuple of risk ratio, lower and upper confidence interval arrays
+    '''
+    a, b, c, d = [np.asarray(x, dtype=float) for x in (a, b, c, d)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # calculate the risk ratio
+        RR = (a/(a+b)) / (c/(c+d))
 
-    # natural log of the RR
-    LN = np.log(RR)
+        # natural log of the RR
+        LN = np.log(RR)
 
-    # get the standard error
-    SE = math.sqrt((1/a)+(1/c)-(1/(a+b))-(1/(c+d)))
+        # get the standard error
+        SE = np.sqrt((1/a)+(1/c)-(1/(a+b))-(1/(c+d)))
 
-    # calculate the lower and upper confidence intervals
-    CI_low = np.exp(LN-1.96*SE)
-    CI_up = np.exp(LN+1.96*SE)
+        # calculate the lower and upper confidence intervals
+        CI_low = np.exp(LN-1.96*SE)
+        CI_up = np.exp(LN+1.96*SE)
 
-    return "{:.2f} ({:.2f}-{:.2f})".format(RR, CI_low, CI_up)
+    return (RR, CI_low, CI_up)
 
 
 def rename_index(df):
@@ -5,8 +5,11 @@ def variant_summary_table(df, outfile=None):
         and likely pathogenic variants return as a table.
     '''
     df = plp_vus(df)
-    gp = df.groupby(['Symbol', 'Category'])['Category'].size()
+    gp = df.groupby(['Symbol', 'Category'], observed=True)['Category'].size()
     table = gp.unstack().fillna(0)
+    # genes in alphabetical rather than category order
+    table.index = table.index.astype(object)
+    table = table.sort_index()
     table = rename_sort_columns(table)
     if outfile:
         table.to_csv(outfile)
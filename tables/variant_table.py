@@ -26,7 +26,7 @@ def filter_table(df, pathogenic=True):
     if pathogenic:
         df = sf.truly_pathogenic(df)
     else:
-        df = df[df['New Category'] == 'VUS']
+        df = sf.vus_only(df)
     table = df[coi]
     return table
 